@@ -3,9 +3,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager, current_user
 from config import Config
+from .database import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login = LoginManager()
 login.login_view = "auth.login"
@@ -17,16 +18,24 @@ def create_app():
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+
+    # SQLite-Pragmas (WAL, busy_timeout) und Read-Engine
+    from . import database
+    database.init_app(app, db)
     login.init_app(app)
 
-    # Import models here to avoid circular import
-    from . import models
-    from .models import User, Recipe
+    # Identitäts-Cache für Flask-Login und token_required
+    from . import identity
+    identity.init_app(app)
+
+    # Passwort-Hashing im Prozess-Pool mit Backpressure (503 + Retry-After)
+    from . import passwords
+    passwords.init_app(app)
 
     # Flask-Login user loader
     @login.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return identity.load_user(int(user_id))
 
     # Register blueprints
     from .auth import bp as auth_bp
@@ -37,6 +46,50 @@ def create_app():
     app.register_blueprint(recipes_bp, url_prefix="/recipes")
     app.register_blueprint(api_bp, url_prefix="/api")
 
+    # HTTP-Caching für die lesenden API-Endpunkte
+    from . import httpcache
+    httpcache.init_app(app)
+
+    # Facetten-Zähler (Kategorie, Schwierigkeit, Dauer) bei jedem Flush nachführen
+    from . import facets
+    facets.init_app(app)
+
+    # Rezept-, Favoriten-, Kommentar- und Bewertungszähler pro User
+    from . import activity
+    activity.init_app(app)
+
+    # Bild-Pipeline (Varianten, Cache-Header)
+    from . import images
+    images.init_app(app)
+
+    # Versionierter Cache für gerenderte Rezeptkarten und Detailseiten
+    from . import fragments
+    fragments.init_app(app)
+
+    # Trending-Bestenliste im Speicher (zeitlich abklingende Scores, periodisch gesichert)
+    from . import trending
+    trending.init_app(app)
+
+    # Live-Updates (SSE) für Kommentare und Bewertungen
+    from . import events
+    events.init_app(app)
+
+    # Optionale Write-Behind-Queue für Bewertungen, Favoriten und Versionssprünge
+    from . import writebehind
+    writebehind.init_app(app)
+
+    # SQL-/Timing-Instrumentierung, Server-Timing-Header und /api/_metrics
+    from . import metrics
+    metrics.init_app(app, db)
+
+    # Rate-Limits (Token-Bucket pro User/IP) und adaptive Lastabwehr (429/503 mit Retry-After)
+    from . import ratelimit
+    ratelimit.init_app(app)
+
+    # CLI-Kommandos (Backfill / Wartung)
+    from .commands import register_commands
+    register_commands(app)
+
     # Home route
     @app.route("/")
     def index():
@@ -0,0 +1,93 @@
+from sqlalchemy import event
+from . import db, identity
+from .models import User, Recipe, Comment, Rating, Favorite
+
+# Zähler pro User: Modell -> (Zähler-Spalte, Spalte mit der User-ID)
+COUNTERS = {
+    Recipe: ("recipe_count", "created_by"),
+    Favorite: ("favorite_count", "user_id"),
+    Comment: ("comment_count", "user_id"),
+    Rating: ("rating_count", "user_id"),
+}
+
+
+def add(deltas, user_id, counter, delta=1):
+    # deltas: {user_id: {"comment_count": 1, ...}}
+    if user_id is not None and delta:
+        counters = deltas.setdefault(user_id, {})
+        counters[counter] = counters.get(counter, 0) + delta
+
+
+def _before_flush(session, flush_context, instances):
+    # Über das ORM angelegte oder gelöschte Objekte; Bulk-Statements melden sich über apply()
+    deltas = {}
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            counter = COUNTERS.get(type(obj))
+            if counter is not None:
+                add(deltas, getattr(obj, counter[1]), counter[0], sign)
+    apply(session, deltas)
+
+
+def apply(session, deltas):
+    """Zähler in derselben Transaktion anpassen, ein UPDATE pro User."""
+    for user_id, counters in deltas.items():
+        values = {getattr(User, name): getattr(User, name) + delta for name, delta in counters.items() if delta}
+        if values:
+            session.execute(db.update(User).where(User.id == user_id).values(values))
+            identity.invalidate_user(user_id)
+
+
+def recipe_deleted(recipe_id):
+    """Vor dem Löschen der Kommentare und Bewertungen eines Rezepts per Query aufrufen.
+
+    Favoriten löscht die Kaskade von session.delete(recipe); die zählt _before_flush.
+    """
+    deltas = {}
+    for model in (Comment, Rating):
+        for user_id, count in owner_counts_query(model, recipe_id):
+            add(deltas, user_id, COUNTERS[model][0], -count)
+    apply(db.session, deltas)
+
+
+def owner_counts_query(model, recipe_id):
+    # Kommentare bzw. Bewertungen eines Rezepts pro User
+    return (
+        db.session.query(model.user_id, db.func.count())
+        .filter(model.recipe_id == recipe_id)
+        .group_by(model.user_id)
+    )
+
+
+def rebuild():
+    """Zähler aller User aus den Tabellen neu berechnen (Backfill / Reparatur)."""
+    User.query.update({getattr(User, name): 0 for name, _ in COUNTERS.values()}, synchronize_session=False)
+    for model, (name, owner) in COUNTERS.items():
+        column = getattr(model, owner)
+        rows = db.session.query(column, db.func.count()).filter(column.isnot(None)).group_by(column)
+        updates = [{"uid": user_id, "n": count} for user_id, count in rows]
+        if updates:
+            # Core-executemany: verwaiste user_ids treffen einfach keine Zeile
+            db.session.execute(
+                db.update(User.__table__).where(User.__table__.c.id == db.bindparam("uid")).values({name: db.bindparam("n")}),
+                updates,
+            )
+    identity.invalidate_all()
+    return User.query.count()
+
+
+def counts_query(user_id):
+    return db.session.query(
+        User.recipe_count, User.favorite_count, User.comment_count, User.rating_count
+    ).filter_by(id=user_id)
+
+
+def counts(user_id):
+    # Frisch aus der Datenbank: current_user kann ein Snapshot aus dem Identitäts-Cache sein
+    row = counts_query(user_id).first()
+    return row._asdict() if row else dict.fromkeys(("recipe_count", "favorite_count", "comment_count", "rating_count"), 0)
+
+
+def init_app(app):
+    if not event.contains(db.session, "before_flush", _before_flush):
+        event.listen(db.session, "before_flush", _before_flush)
@@ -0,0 +1,189 @@
+"""ASGI-Einstieg mit asynchronem Datenbanktreiber für die lesenden API-Endpunkte.
+
+Die Lese-Endpunkte (READ_ENDPOINTS) laufen als Task auf dem Event-Loop: der
+bestehende Flask-View wird per AsyncSession.run_sync ausgeführt, db.session zeigt
+dabei auf die Session des asynchronen Treibers (aiosqlite/asyncpg). Jede Query
+wartet so auf dem Loop statt einen Thread zu blockieren; Antworten (Body, ETag,
+304, Fehler) sind identisch mit der WSGI-Variante. Alle anderen Routen laufen
+unverändert über die WSGI-App, angebunden per a2wsgi mit begrenztem Thread-Pool.
+
+Event-Streams (SSE) warten auf dem Loop statt je einen Thread zu belegen.
+
+Benötigt a2wsgi, greenlet und den passenden Treiber (aiosqlite bzw. asyncpg).
+"""
+import asyncio
+import io
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+from . import db, database, metrics
+
+READ_ENDPOINTS = {"api.list_recipes", "api.get_recipe", "api.get_comments", "api.list_favorites", "api.recipe_events"}
+READ_METHODS = ("GET", "HEAD")
+# Synchrone URL -> asynchroner Treiber
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+# Gepufferte Chunks pro WSGI-Antwort, bevor der Worker-Thread auf den Client wartet
+WSGI_QUEUE = 8
+
+
+def async_url(url):
+    scheme, sep, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if driver is None:
+        raise ValueError(f"Kein asynchroner Treiber für {scheme}")
+    return driver + sep + rest
+
+
+def _headers(headers):
+    return [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers]
+
+
+class ASGIApp:
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        url = config.get("ASYNC_DATABASE_URL")
+        if not url:
+            # URL der fertigen Engine: Flask-SQLAlchemy legt relative SQLite-Pfade in instance/
+            with app.app_context():
+                engines = db.engines
+                engine = engines.get(database.READ_BIND) or engines[None]
+                url = async_url(engine.url.render_as_string(hide_password=False))
+        self.engine = create_async_engine(url, **config.get("ASYNC_ENGINE_OPTIONS", {}))
+        if self.engine.dialect.name == "sqlite":
+            # Wie die Read-Engine: gleiche Pragmas, nur lesend
+            event.listen(
+                self.engine.sync_engine, "connect",
+                database._sqlite_pragmas(config.get("SQLITE_PRAGMAS", {}), read_only=True),
+            )
+        metrics.instrument(self.engine.sync_engine)
+        # Flask-SQLAlchemy-Query (paginate, first_or_404) auch auf der asynchronen Session
+        self.sessions = async_sessionmaker(
+            self.engine, sync_session_class=Session, query_cls=db.Query, expire_on_commit=False
+        )
+        # Alle übrigen Routen: WSGI-App im Thread-Pool, Request- und Response-Body gestreamt
+        self.wsgi = WSGIMiddleware(app, workers=config.get("ASYNC_WSGI_THREADS", 8), send_queue_size=WSGI_QUEUE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            raise RuntimeError(f"Nicht unterstützter ASGI-Scope: {scope['type']}")
+        if scope["method"] in READ_METHODS and self._endpoint(scope) in READ_ENDPOINTS:
+            return await self._read(scope, receive, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _endpoint(self, scope):
+        adapter = self.app.url_map.bind(
+            "localhost", script_name=scope.get("root_path") or None, url_scheme=scope.get("scheme", "http")
+        )
+        try:
+            endpoint, _ = adapter.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return None
+        return endpoint
+
+    def _dispatch(self):
+        # Wie Flask.wsgi_app, nur ohne eigenen Request-Kontext
+        try:
+            return self.app.full_dispatch_request()
+        except Exception as e:
+            return self.app.handle_exception(e)
+
+    async def _read(self, scope, receive, send):
+        environ = build_environ(scope, io.BytesIO())
+        async with self.sessions() as session:
+            with self.app.request_context(environ):
+                # db.session (und Model.query) für diesen Request auf die asynchrone Session lenken
+                db.session.registry.set(session.sync_session)
+                try:
+                    response = await session.run_sync(lambda _: self._dispatch())
+                    if hasattr(response.response, "__aiter__"):
+                        # Event-Stream: Verbindung zurückgeben, er kann minutenlang offen bleiben
+                        await session.close()
+                        await self._send_events(response, environ, receive, send)
+                    else:
+                        await self._send_response(session, response, environ, send)
+                finally:
+                    # Vor dem Teardown entfernen, Flask-SQLAlchemy würde sie sonst synchron schließen
+                    db.session.registry.clear()
+
+    async def _send_response(self, session, response, environ, send):
+        body, status, headers = response.get_wsgi_response(environ)
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": _headers(headers),
+        })
+        if not response.is_streamed:
+            await send({"type": "http.response.body", "body": b"".join(body)})
+            return
+        try:
+            # Streams (Favoriten, ?stream=1) holen ihre Batches per Server-Cursor
+            chunks = iter(body)
+            while True:
+                chunk = await session.run_sync(lambda _: next(chunks, None))
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await session.run_sync(lambda _: response.close())
+
+    async def _send_events(self, response, environ, receive, send):
+        _, status, headers = response.get_wsgi_response(environ)
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": _headers(headers),
+        })
+        chunks = response.response.__aiter__()
+        # Abbruch durch den Client erkennen, sonst liefe der Stream bis max_seconds weiter
+        disconnected = asyncio.ensure_future(_disconnect(receive))
+        try:
+            while True:
+                chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    await asyncio.gather(chunk, return_exceptions=True)
+                    return
+                try:
+                    data = chunk.result()
+                except StopAsyncIteration:
+                    break
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+            await chunks.aclose()
+            response.close()
+
+
+async def _disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def create_asgi_app(app):
+    return ASGIApp(app)
@@ -1,20 +1,44 @@
-from flask import Blueprint, jsonify, request, current_app
-from .models import Recipe, User, Comment, Rating, Favorite
-from . import db
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
+from .models import Recipe, Comment, SimilarRecipe
+from . import db, search, httpcache, identity, bulk, indexing, ingredients, metrics, passwords, fieldsets, facets, serializers, writebehind, fragments, trending, events, ratelimit, queries
+from .cache import TTLCache
+from .pagination import keyset_page, InvalidCursor
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 
 bp = Blueprint("api", __name__)
+MAX_PER_PAGE = 100
+# Gesamtzahlen nur bei Bedarf und kurz gecacht, statt COUNT(*) bei jedem Seitenabruf
+_totals = TTLCache(maxsize=1024, ttl=60)
+
+
+def _per_page(default):
+    per = request.args.get("per_page", default, type=int)
+    return max(1, min(per, MAX_PER_PAGE))
+
+
+def _cached_total(key, query):
+    return _totals.get_or_set(key, lambda: queries.total(query))
+
+
+def _fieldset(default):
+    # ?fields=id,title&include=author,rating_summary,comments
+    return (
+        fieldsets.parse_fields(request.args.get("fields"), default),
+        fieldsets.parse_includes(request.args.get("include")),
+    )
 
 @bp.route("/token", methods=["POST"])
 def get_token():
     auth = request.authorization
     if not auth:
         return jsonify({"message": "Missing credentials"}), 401
-    user = User.query.filter_by(username=auth.username).first()
+    user = queries.user_by_username(auth.username).first()
     if user is None or not user.check_password(auth.password):
         return jsonify({"message": "Invalid credentials"}), 401
+    if passwords.upgrade(user, auth.password):
+        db.session.commit()
     payload = {"user_id": user.id, "exp": datetime.utcnow() + timedelta(hours=24)}
     token = jwt.encode(payload, current_app.config["JWT_SECRET"], algorithm="HS256")
     return jsonify({"token": token})
@@ -27,8 +51,8 @@ def token_required(f):
             return jsonify({"message":"Token fehlt"}), 401
         try:
             token = auth_header.split()[1]
-            data = jwt.decode(token, current_app.config["JWT_SECRET"], algorithms=["HS256"])
-            user = User.query.get(data["user_id"])
+            data = identity.decode_token(token)
+            user = identity.load_user(data["user_id"])
             if not user:
                 raise Exception("User nicht gefunden")
             request.user = user
@@ -37,28 +61,185 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+@bp.route("/_stats", methods=["GET"])
+@token_required
+def cache_stats():
+    if not request.user.is_admin:
+        return jsonify({"message": "Forbidden"}), 403
+    return jsonify({"identity": identity.stats(), "fragments": fragments.stats(), "write_behind": writebehind.stats(), "events": events.stats(), "ratelimit": ratelimit.stats()})
+
+@bp.route("/_metrics", methods=["GET"])
+def prometheus_metrics():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return jsonify({"message": "Forbidden"}), 403
+    caches = dict(identity.stats(), responses=current_app.extensions["httpcache"].stats(), fragments=fragments.stats())
+    gauges = [
+        (f"app_cache_{field}", f"Cache {field} per in-process cache.",
+         [({"cache": name}, stats[field]) for name, stats in sorted(caches.items())])
+        for field in ("hits", "misses", "size")
+    ]
+    gauges.append(("app_event_streams", "Open Server-Sent Events streams.", [({}, events.stats()["subscribers"])]))
+    limits = ratelimit.stats()
+    gauges.append(("app_rate_limited", "Requests rejected by rate limits (429).", [({}, limits["limited"])]))
+    if limits["shedding"] is not None:
+        gauges += [
+            ("app_shed_requests", "Requests rejected by load shedding (503).", [({}, limits["shedding"]["shed"])]),
+            ("app_concurrency_limit", "Current adaptive concurrency limit.", [({}, limits["shedding"]["limit"])]),
+            ("app_inflight_requests", "Requests currently in progress.", [({}, limits["shedding"]["inflight"])]),
+        ]
+    body = metrics.registry.render(gauges)
+    return current_app.response_class(body, mimetype="text/plain; version=0.0.4")
+
 @bp.route("/recipes", methods=["GET"])
 def list_recipes():
-    page = int(request.args.get("page", 1))
-    per = int(request.args.get("per_page", 20))
-    q = Recipe.query.order_by(Recipe.created_at.desc())
-    recipes = q.paginate(page=page, per_page=per, error_out=False)
-    data = [{"id": r.id, "title": r.title, "category": r.category, "duration_min": r.duration_min} for r in recipes.items]
-    return jsonify({"recipes": data, "page": page, "total": recipes.total})
+    per = _per_page(20)
+    try:
+        fields, includes = _fieldset(fieldsets.LIST_FIELDS)
+    except fieldsets.InvalidFieldset as e:
+        return jsonify({"message": str(e)}), 400
+    # Nur die angeforderten Spalten laden, die Text-Spalten bleiben sonst außen vor;
+    # gleiche Facetten-Filter wie die Übersicht (?category=..&difficulty=..&duration=..)
+    selection = facets.selected(request.args)
+    query = queries.recipe_list(selection, fields, includes)
+
+    if "ids" in request.args:
+        return _recipes_by_ids(query, fields, includes)
+
+    # Alte Clients mit ?page= bekommen weiterhin OFFSET-Pagination
+    if "page" in request.args and "cursor" not in request.args:
+        page = request.args.get("page", 1, type=int)
+        q = query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
+        recipes = q.paginate(page=page, per_page=per, error_out=False)
+        data = fieldsets.serialize(recipes.items, fields, includes)
+        return jsonify({"recipes": data, "page": page, "total": recipes.total})
+
+    cursor = request.args.get("cursor")
+    include_total = request.args.get("include_total", type=int)
+    page = {}
+
+    def validator():
+        page["items"], page["next_cursor"] = keyset_page(query, Recipe.created_at, Recipe.id, cursor, per)
+        return httpcache.make_etag(
+            "recipes", [(r.id, r.version) for r in page["items"]], include_total, fields, includes
+        ), None
+
+    def build():
+        data = fieldsets.serialize(page["items"], fields, includes)
+        response = {"recipes": data, "next_cursor": page["next_cursor"], "per_page": per}
+        if include_total:
+            # Pro Facetten-Auswahl zählen; Reihenfolge und Duplikate der Parameter egal
+            key = ("recipes",) + tuple(tuple(sorted(set(selection[kind]))) for kind in facets.KINDS)
+            response["total"] = _cached_total(key, query)
+        return response
+
+    try:
+        return httpcache.conditional([httpcache.LIST_TAG], validator, build)
+    except InvalidCursor:
+        return jsonify({"message": "Invalid cursor"}), 400
+
+
+def _recipes_by_ids(query, fields, includes):
+    # GET /api/recipes?ids=1,2,3: mehrere Rezepte in einem Round-Trip, Reihenfolge wie angefragt
+    try:
+        ids = fieldsets.parse_ids(request.args.get("ids"), MAX_PER_PAGE)
+    except fieldsets.InvalidFieldset as e:
+        return jsonify({"message": str(e)}), 400
+    found = {}
+
+    def validator():
+        if ids:
+            found.update((r.id, r) for r in query.filter(Recipe.id.in_(ids)))
+        return httpcache.make_etag(
+            "recipes-batch", sorted((r.id, r.version) for r in found.values()), fields, includes
+        ), None
+
+    def build():
+        recipes = [found[i] for i in ids if i in found]
+        return {
+            "recipes": fieldsets.serialize(recipes, fields, includes),
+            "missing": [i for i in ids if i not in found],
+        }
+
+    return httpcache.conditional(ids, validator, build)
+
+@bp.route("/search", methods=["GET"])
+def search_recipes():
+    q = request.args.get("q", "").strip()
+    if not search.match_expression(q):
+        return jsonify({"message": "Query required"}), 400
+    page = request.args.get("page", 1, type=int)
+    per = _per_page(20)
+    try:
+        fields, includes = _fieldset(fieldsets.LIST_FIELDS)
+    except fieldsets.InvalidFieldset as e:
+        return jsonify({"message": str(e)}), 400
+    results = queries.search_results(q, fields, includes).paginate(page=page, per_page=per, error_out=False)
+    data = fieldsets.serialize(results.items, fields, includes)
+    return jsonify({"results": data, "query": q, "page": page, "total": results.total})
+
+@bp.route("/facets", methods=["GET"])
+def list_facets():
+    # Filterwerte mit Anzahl, gelesen aus der Facetten-Tabelle
+    data = {}
+
+    def validator():
+        data.update(facets.load())
+        return httpcache.make_etag("facets", data), None
+
+    return httpcache.conditional([httpcache.LIST_TAG], validator, lambda: {"facets": data})
+
+@bp.route("/recipes/by-ingredients", methods=["GET"])
+def recipes_by_ingredients():
+    # ?have=Hühnchen,Reis[&match=all]
+    have = [item for item in request.args.get("have", "").split(",") if item.strip()]
+    if not have:
+        return jsonify({"message": "Ingredients required"}), 400
+    per = _per_page(20)
+    terms, rows = ingredients.find_by_pantry(have, limit=per, require_all=request.args.get("match") == "all")
+    data = [dict(
+        serializers.recipe_schema.dump(r, fieldsets.LIST_FIELDS),
+        matched=matched,
+        missing=r.ingredient_count - matched,
+        coverage=round(matched / r.ingredient_count, 2) if r.ingredient_count else 1.0,
+    ) for r, matched in rows]
+    return jsonify({"recipes": data, "terms": terms})
+
+@bp.route("/recipes/trending", methods=["GET"])
+def trending_recipes():
+    # Rangliste aus dem Speicher, Rezeptdaten per Primärschlüssel (kein Scan über Interaktionen)
+    limit = max(1, min(request.args.get("limit", 20, type=int), trending.size() or 1))
+    try:
+        fields, includes = _fieldset(fieldsets.LIST_FIELDS)
+    except fieldsets.InvalidFieldset as e:
+        return jsonify({"message": str(e)}), 400
+    scores = dict(trending.top(limit))
+    found = {}
+    if scores:
+        found = {r.id: r for r in queries.recipes_by_ids(list(scores), fields, includes)}
+    data = fieldsets.serialize([found[rid] for rid in scores if rid in found], fields, includes)
+    for item in data:
+        item["score"] = round(scores[item["id"]], 4)
+    return jsonify({"recipes": data})
 
 @bp.route("/recipes/<int:recipe_id>", methods=["GET"])
 def get_recipe(recipe_id):
-    r = Recipe.query.get_or_404(recipe_id)
-    return jsonify({
-        "id": r.id,
-        "title": r.title,
-        "description": r.description,
-        "ingredients": r.ingredients,
-        "steps": r.steps,
-        "category": r.category,
-        "duration_min": r.duration_min,
-        "difficulty": r.difficulty
-    })
+    try:
+        fields, includes = _fieldset(fieldsets.DETAIL_FIELDS)
+    except fieldsets.InvalidFieldset as e:
+        return jsonify({"message": str(e)}), 400
+
+    def validator():
+        row = queries.recipe_version(recipe_id).first()
+        if row is None:
+            return None
+        return httpcache.make_etag("recipe", recipe_id, row.version, fields, includes), row.updated_at
+
+    def build():
+        r = Recipe.query.options(fieldsets.load_options(fields, includes)).filter_by(id=recipe_id).first_or_404()
+        return fieldsets.serialize([r], fields, includes)[0]
+
+    return httpcache.conditional([recipe_id], validator, build)
 
 @bp.route("/recipes", methods=["POST"])
 @token_required
@@ -77,20 +258,77 @@ def create_recipe():
         created_by=request.user.id
     )
     db.session.add(r)
+    indexing.recipe_saved(r)
     db.session.commit()
     return jsonify({"id": r.id}), 201
 
 
+@bp.route("/recipes/bulk", methods=["POST"])
+@token_required
+def bulk_import():
+    # NDJSON zeilenweise aus dem Request-Stream lesen, nie komplett im Speicher
+    request.max_content_length = current_app.config["BULK_MAX_CONTENT_LENGTH"]
+    result = bulk.import_ndjson(request.stream, request.user.id)
+    status = 201 if result["inserted"] else 400
+    return jsonify(result), status
+
+
+@bp.route("/recipes/export", methods=["GET"])
+@token_required
+def export_recipes():
+    # Standard NDJSON; ?format=json liefert ein gestreamtes JSON-Array
+    if request.args.get("format") == "json":
+        return serializers.streaming_response(serializers.batched(bulk.export_rows()), "recipes")
+    return Response(stream_with_context(bulk.export_ndjson()), mimetype="application/x-ndjson")
+
+
+@bp.route("/recipes/<int:recipe_id>/similar", methods=["GET"])
+def similar_recipes(recipe_id):
+    # Vorberechnet von flask build-similar, eine Abfrage über den Primärschlüssel
+    return jsonify({"similar": serializers.similar_schema.dump_many(SimilarRecipe.for_recipe(recipe_id))})
+
+
 @bp.route("/recipes/<int:recipe_id>/comments", methods=["GET"])
 def get_comments(recipe_id):
-    comments = Comment.query.filter_by(recipe_id=recipe_id).order_by(Comment.created_at.desc()).all()
-    data = [{
-        "id": c.id,
-        "text": c.text,
-        "user_id": c.user_id,
-        "created_at": c.created_at.isoformat()
-    } for c in comments]
-    return jsonify({"comments": data})
+    per = _per_page(50)
+    cursor = request.args.get("cursor")
+    include_total = request.args.get("include_total", type=int)
+    # ?include=author: Benutzername mitliefern (eine Query per Join)
+    with_author = "author" in request.args.get("include", "").split(",")
+    query = queries.recipe_comments(recipe_id)
+    schema = serializers.comment_schema
+    if with_author:
+        query = query.options(db.joinedload(Comment.author))
+        schema = serializers.comment_author_schema
+
+    # ?stream=1: alle Kommentare als Stream vom Server-Cursor, ohne Seiten
+    if request.args.get("stream", type=int):
+        if db.session.query(Recipe.id).filter_by(id=recipe_id).first() is None:
+            return jsonify({"message": "Not found"}), 404
+        rows = query.order_by(Comment.created_at.desc(), Comment.id.desc()).yield_per(serializers.STREAM_BATCH)
+        batches = (schema.dump_many(batch) for batch in serializers.batched(rows))
+        return serializers.streaming_response(batches, "comments")
+
+    # Neue Kommentare erhöhen die Rezept-Version, daher reicht sie als Validator
+    def validator():
+        row = queries.recipe_version(recipe_id).first()
+        if row is None:
+            return None
+        return httpcache.make_etag(
+            "comments", recipe_id, row.version, cursor, per, include_total, with_author
+        ), row.updated_at
+
+    def build():
+        comments, next_cursor = keyset_page(query, Comment.created_at, Comment.id, cursor, per)
+        response = {"comments": schema.dump_many(comments), "next_cursor": next_cursor}
+        if include_total:
+            response["total"] = _cached_total(("comments", recipe_id), query)
+        return response
+
+    try:
+        return httpcache.conditional([recipe_id], validator, build)
+    except InvalidCursor:
+        return jsonify({"message": "Invalid cursor"}), 400
 
 
 @bp.route("/recipes/<int:recipe_id>/comments", methods=["POST"])
@@ -102,9 +340,30 @@ def create_comment(recipe_id):
     c = Comment(recipe_id=recipe_id, user_id=request.user.id, text=data.get("text"))
     db.session.add(c)
     db.session.commit()
+    writebehind.touch(recipe_id)
+    trending.record(recipe_id, "comment")
+    events.comment_added(c, request.user.username)
     return jsonify({"id": c.id}), 201
 
 
+@bp.route("/recipes/<int:recipe_id>/events", methods=["GET"])
+def recipe_events(recipe_id):
+    # Server-Sent Events: neue Kommentare und Bewertungsdurchschnitt eines Rezepts.
+    # Nach einem Abbruch setzt der Browser per Last-Event-ID fort; ist das nicht mehr
+    # möglich, kommt ein "reset"-Event und der Client holt Kommentare und Bewertung neu.
+    if db.session.query(Recipe.id).filter_by(id=recipe_id).first() is None:
+        return jsonify({"message": "Not found"}), 404
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        stream = events.subscribe(recipe_id, last_event_id)
+    except events.TooManySubscribers as e:
+        return jsonify({"message": "Too many event streams"}), 503, {"Retry-After": str(e.retry_after)}
+    return current_app.response_class(stream, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
 @bp.route("/recipes/<int:recipe_id>/ratings", methods=["POST"])
 @token_required
 def rate_recipe(recipe_id):
@@ -113,43 +372,42 @@ def rate_recipe(recipe_id):
     if not stars or stars < 1 or stars > 5:
         return jsonify({"message": "Stars must be 1-5"}), 400
 
-    existing = Rating.query.filter_by(recipe_id=recipe_id, user_id=request.user.id).first()
-    if existing:
-        existing.stars = stars
-    else:
-        rating = Rating(recipe_id=recipe_id, user_id=request.user.id, stars=stars)
-        db.session.add(rating)
-    db.session.commit()
+    Recipe.query.get_or_404(recipe_id)
+    # 202, wenn die Bewertung nur eingereiht wurde (Write-Behind aktiv)
+    if writebehind.rate(recipe_id, request.user.id, stars):
+        return jsonify({"message": "Rating accepted"}), 202
     return jsonify({"message": "Rating saved"}), 200
 
 
 @bp.route("/favorites", methods=["GET"])
 @token_required
 def list_favorites():
-    favs = Favorite.query.filter_by(user_id=request.user.id).all()
-    recipe_ids = [f.recipe_id for f in favs]
-    recipes = Recipe.query.filter(Recipe.id.in_(recipe_ids)).all() if recipe_ids else []
-    data = [{"id": r.id, "title": r.title, "image_url": r.image_url} for r in recipes]
-    return jsonify({"favorites": data}), 200
+    try:
+        fields, includes = _fieldset(fieldsets.FAVORITE_FIELDS)
+    except fieldsets.InvalidFieldset as e:
+        return jsonify({"message": str(e)}), 400
+    recipes = (
+        queries.favorite_recipes(request.user.id, by_favorited=True)
+        .options(fieldsets.load_options(fields, includes))
+        .yield_per(serializers.STREAM_BATCH)
+    )
+    # Ungebegrenzte Liste: batchweise laden, serialisieren (inkl. Includes) und streamen
+    batches = (fieldsets.serialize(batch, fields, includes) for batch in serializers.batched(recipes))
+    return serializers.streaming_response(batches, "favorites")
 
 
 @bp.route("/recipes/<int:recipe_id>/favorite", methods=["POST"])
 @token_required
 def add_favorite(recipe_id):
     Recipe.query.get_or_404(recipe_id)
-    existing = Favorite.query.filter_by(recipe_id=recipe_id, user_id=request.user.id).first()
-    if not existing:
-        fav = Favorite(recipe_id=recipe_id, user_id=request.user.id)
-        db.session.add(fav)
-        db.session.commit()
+    if not writebehind.is_favorite(recipe_id, request.user.id):
+        writebehind.favorite(recipe_id, request.user.id)
     return jsonify({"message": "Favorited"}), 201
 
 
 @bp.route("/recipes/<int:recipe_id>/favorite", methods=["DELETE"])
 @token_required
 def remove_favorite(recipe_id):
-    existing = Favorite.query.filter_by(recipe_id=recipe_id, user_id=request.user.id).first()
-    if existing:
-        db.session.delete(existing)
-        db.session.commit()
+    if writebehind.is_favorite(recipe_id, request.user.id):
+        writebehind.favorite(recipe_id, request.user.id, add=False)
     return jsonify({"message": "Unfavorited"}), 200
\ No newline at end of file
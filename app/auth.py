@@ -1,10 +1,13 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-from . import db
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from . import db, passwords, fragments, activity, queries
 from .models import User, Recipe, Favorite
+from .pagination import keyset_page, InvalidCursor
 from flask_login import login_user, logout_user, login_required, current_user
 
 # Hier den Blueprint definieren
 bp = Blueprint("auth", __name__)
+# Karten pro Seite in den Profil-Tabs
+PROFILE_PER_PAGE = 12
 
 @bp.route("/register", methods=["GET", "POST"])
 def register():
@@ -17,11 +20,11 @@ def register():
             flash("Bitte alle Felder ausfüllen")
             return redirect(url_for("auth.register"))
 
-        if User.query.filter_by(username=username).first():
+        if queries.user_by_username(username).first():
             flash("Benutzername bereits vergeben")
             return redirect(url_for("auth.register"))
 
-        if User.query.filter_by(email=email).first():
+        if queries.user_by_email(email).first():
             flash("E-Mail bereits registriert")
             return redirect(url_for("auth.register"))
 
@@ -40,10 +43,13 @@ def login():
     if request.method == "POST":
         username = request.form.get("username")
         password = request.form.get("password")
-        user = User.query.filter_by(username=username).first()
+        user = queries.user_by_username(username).first()
         if user is None or not user.check_password(password):
             flash("Ungültige Anmeldedaten")
             return redirect(url_for("auth.login"))
+        # Alte Hash-Parameter beim Login transparent anheben
+        if passwords.upgrade(user, password):
+            db.session.commit()
         login_user(user)
         return redirect(url_for("recipes.index"))
 
@@ -57,17 +63,46 @@ def logout():
     return redirect(url_for("auth.login"))
 
 
+def _profile_recipes(cursor=None):
+    recipes, next_cursor = keyset_page(
+        queries.user_recipes(current_user.id), Recipe.created_at, Recipe.id, cursor, PROFILE_PER_PAGE
+    )
+    return fragments.recipe_cards(recipes, "fragments/profile_card.html", show_author=False), next_cursor
+
+
+def _profile_favorites(cursor=None):
+    # Sortiert nach Favorisierungszeitpunkt, Cursor über (Favorite.created_at, Favorite.id)
+    favorites, next_cursor = keyset_page(
+        queries.user_favorites(current_user.id), Favorite.created_at, Favorite.id, cursor, PROFILE_PER_PAGE
+    )
+    recipes = [f.recipe for f in favorites]
+    return fragments.recipe_cards(recipes, "fragments/profile_card.html", show_author=True), next_cursor
+
+
 @bp.route("/profile")
 @login_required
 def profile():
-    user_recipes = Recipe.query.filter_by(created_by=current_user.id).order_by(Recipe.created_at.desc()).all()
-
-    favorite_recipes = (
-        Recipe.query
-        .join(Favorite, Favorite.recipe_id == Recipe.id)
-        .filter(Favorite.user_id == current_user.id)
-        .order_by(Favorite.created_at.desc())
-        .all()
+    # Zähler und je eine Seite pro Tab, unabhängig von der Anzahl der Rezepte und Favoriten
+    user_recipes, recipes_cursor = _profile_recipes()
+    favorite_recipes, favorites_cursor = _profile_favorites()
+    return render_template(
+        "profile.html",
+        counts=activity.counts(current_user.id),
+        user_recipes=user_recipes,
+        recipes_cursor=recipes_cursor,
+        favorite_recipes=favorite_recipes,
+        favorites_cursor=favorites_cursor,
     )
 
-    return render_template("profile.html", user_recipes=user_recipes, favorite_recipes=favorite_recipes)
\ No newline at end of file
+
+@bp.route("/profile/<any(recipes, favorites):tab>")
+@login_required
+def profile_page(tab):
+    # Weitere Seiten eines Profil-Tabs als JSON: {"html": Karten, "next_cursor": ...}
+    load = _profile_recipes if tab == "recipes" else _profile_favorites
+    try:
+        cards, next_cursor = load(request.args.get("cursor"))
+    except InvalidCursor:
+        return jsonify({"message": "Invalid cursor"}), 400
+    html = render_template("profile_cards.html", cards=cards, tab=tab)
+    return jsonify({"html": html, "next_cursor": next_cursor})
\ No newline at end of file
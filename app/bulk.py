@@ -0,0 +1,135 @@
+import json
+from . import db, indexing, serializers
+from .models import Recipe
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Obergrenze von INTEGER-Spalten (SQLite/PostgreSQL), größere Werte scheitern erst beim Flush
+MAX_INT = 2 ** 31 - 1
+
+TEXT_FIELDS = ("title", "description", "ingredients", "steps", "category", "difficulty")
+EXPORT_FIELDS = (
+    "id", "title", "description", "ingredients", "steps", "category",
+    "duration_min", "difficulty", "image_url", "created_by",
+)
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_row(line):
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        raise RowError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise RowError("Expected a JSON object")
+
+    row = {}
+    for field in TEXT_FIELDS:
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            raise RowError(f"{field} must be a string")
+        # Längen wie im Modell (String(140), String(64), ...), Text-Spalten sind unbegrenzt
+        length = getattr(Recipe.__table__.c[field].type, "length", None)
+        if value is not None and length is not None and len(value) > length:
+            raise RowError("Title too long" if field == "title" else f"{field} too long (max {length})")
+        row[field] = value
+    if not row["title"]:
+        raise RowError("Title required")
+
+    duration = data.get("duration_min")
+    if duration is not None and (
+        not isinstance(duration, int) or isinstance(duration, bool) or not 0 <= duration <= MAX_INT
+    ):
+        raise RowError("duration_min must be a positive integer")
+    row["duration_min"] = duration
+    return row
+
+
+def _insert(batch, user_id):
+    """Schreibt den Batch in einer Transaktion; schlägt er fehl, werden die Hälften einzeln geschrieben.
+
+    So wird nur die fehlerhafte Zeile gemeldet, der Rest des Batches landet in der Datenbank.
+    Gibt die fehlgeschlagenen Zeilen als (Zeilennummer, Exception) zurück.
+    """
+    recipes = [Recipe(created_by=user_id, **row) for _, row in batch]
+    try:
+        db.session.add_all(recipes)
+        db.session.flush()
+        indexing.recipes_created(recipes)
+        db.session.commit()
+        return []
+    except Exception as e:
+        db.session.rollback()
+        if len(batch) == 1:
+            return [(batch[0][0], e)]
+    middle = len(batch) // 2
+    return _insert(batch[:middle], user_id) + _insert(batch[middle:], user_id)
+
+
+def _flush_batch(batch, user_id, result):
+    # batch: Liste von (Zeilennummer, Felder); eine Transaktion pro Batch
+    failed = _insert(batch, user_id)
+    for line_no, e in failed:
+        _report(result, line_no, f"Database error: {e.__class__.__name__}")
+    result["failed"] += len(failed)
+    result["inserted"] += len(batch) - len(failed)
+
+
+def _report(result, line_no, message):
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append({"line": line_no, "error": message})
+    else:
+        result["errors_truncated"] = True
+
+
+def import_ndjson(lines, user_id, batch_size=IMPORT_BATCH_SIZE):
+    """Importiert Rezepte zeilenweise aus NDJSON, in Batches mit je einem Commit.
+
+    Es liegt nie mehr als ein Batch im Speicher; fehlerhafte Zeilen werden mit
+    Zeilennummer gemeldet und übersprungen.
+    """
+    result = {"inserted": 0, "failed": 0, "errors": []}
+    batch = []
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            batch.append((line_no, parse_row(line)))
+        except RowError as e:
+            result["failed"] += 1
+            _report(result, line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _flush_batch(batch, user_id, result)
+            batch = []
+    if batch:
+        _flush_batch(batch, user_id, result)
+    return result
+
+
+def export_rows(batch_size=EXPORT_BATCH_SIZE):
+    # Keyset über die ID: konstanter Speicher, gleiche Kosten pro Batch
+    last_id = 0
+    while True:
+        recipes = (
+            Recipe.query.filter(Recipe.id > last_id)
+            .order_by(Recipe.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not recipes:
+            return
+        for r in recipes:
+            row = {field: getattr(r, field) for field in EXPORT_FIELDS}
+            row["created_at"] = r.created_at.isoformat() if r.created_at else None
+            yield row
+        last_id = recipes[-1].id
+
+
+def export_ndjson(batch_size=EXPORT_BATCH_SIZE):
+    for row in export_rows(batch_size):
+        yield serializers.dumps(row) + "\n"
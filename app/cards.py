@@ -0,0 +1,51 @@
+from . import db
+from .models import User, Comment, Favorite
+
+
+class RecipeCard:
+    """View-Model für eine Rezeptkarte (Übersicht, Favoriten, Profil)."""
+
+    def __init__(self, recipe, author=None, favorite_count=0, comment_count=0):
+        self.recipe = recipe
+        self.author = author
+        self.favorite_count = favorite_count
+        self.comment_count = comment_count
+
+    @property
+    def average_rating(self):
+        return self.recipe.average_rating()
+
+    @property
+    def rating_count(self):
+        return self.recipe.rating_count()
+
+
+def counts_query(column, recipe_ids):
+    return db.session.query(column, db.func.count()).filter(column.in_(recipe_ids)).group_by(column)
+
+
+def authors_query(author_ids):
+    return User.query.filter(User.id.in_(author_ids))
+
+
+def load_recipe_cards(recipes):
+    # Lädt Autoren und Zähler für alle Karten einer Seite in konstant vielen Queries
+    recipes = list(recipes)
+    if not recipes:
+        return []
+
+    recipe_ids = [r.id for r in recipes]
+    author_ids = {r.created_by for r in recipes if r.created_by is not None}
+    authors = {u.id: u for u in authors_query(author_ids)} if author_ids else {}
+    favorite_counts = dict(counts_query(Favorite.recipe_id, recipe_ids).all())
+    comment_counts = dict(counts_query(Comment.recipe_id, recipe_ids).all())
+
+    return [
+        RecipeCard(
+            r,
+            author=authors.get(r.created_by),
+            favorite_count=favorite_counts.get(r.id, 0),
+            comment_count=comment_counts.get(r.id, 0),
+        )
+        for r in recipes
+    ]
@@ -0,0 +1,131 @@
+import click
+from flask.cli import with_appcontext
+from . import db
+from .models import Recipe
+from . import search, bulk, ingredients, similar, queryplans, facets, trending, activity
+
+
+@click.command("recount-ratings")
+@with_appcontext
+def recount_ratings():
+    """Bewertungs-Aggregate aller Rezepte aus der Rating-Tabelle neu berechnen."""
+    updated = Recipe.recount_ratings()
+    db.session.commit()
+    click.echo(f"{updated} Rezepte aktualisiert")
+
+
+@click.command("search-rebuild")
+@with_appcontext
+def search_rebuild():
+    """Volltext-Index (FTS5) samt Spaltengewichten anlegen und über alle Rezepte neu aufbauen."""
+    if not search.fts_supported():
+        click.echo("Volltext-Index wird nur mit SQLite unterstützt")
+        return
+    indexed = search.rebuild_index()
+    db.session.commit()
+    click.echo(f"{indexed} Rezepte indexiert")
+
+
+@click.command("ingredients-rebuild")
+@with_appcontext
+def ingredients_rebuild():
+    """Zutaten-Index (Posting-Listen) für alle Rezepte neu aufbauen."""
+    total = ingredients.rebuild_index()
+    click.echo(f"{total} Rezepte indexiert")
+
+
+@click.command("facets-rebuild")
+@with_appcontext
+def facets_rebuild():
+    """Facetten-Zähler (Kategorie, Schwierigkeit, Dauer) aus den Rezepten neu berechnen."""
+    total = facets.rebuild()
+    db.session.commit()
+    click.echo(f"{total} Facettenwerte berechnet")
+
+
+@click.command("build-similar")
+@click.option("--k", default=10, show_default=True, help="Nachbarn pro Rezept")
+@click.option("--time-budget", type=float, default=None, help="Abbruch nach N Sekunden (nach dem laufenden Block)")
+@click.option("--changed-only", is_flag=True, help="Nur Rezepte mit geänderten Bewertungen/Favoriten")
+@with_appcontext
+def build_similar(k, time_budget, changed_only):
+    """Ähnliche Rezepte aus Bewertungen und Favoriten vorberechnen."""
+    if not similar.available():
+        raise click.ClickException("numpy und scipy werden für build-similar benötigt")
+    recipe_ids = similar.changed_recipe_ids() if changed_only else None
+    done = similar.build(k=k, time_budget=time_budget, recipe_ids=recipe_ids)
+    click.echo(f"{done} Rezepte berechnet")
+
+
+@click.command("export-recipes")
+@click.argument("output", type=click.File("w", encoding="utf-8"), default="-")
+@with_appcontext
+def export_recipes(output):
+    """Alle Rezepte als NDJSON exportieren (Datei oder stdout)."""
+    for line in bulk.export_ndjson():
+        output.write(line)
+
+
+@click.command("import-recipes")
+@click.argument("source", type=click.File("rb"), default="-")
+@click.option("--user-id", type=int, required=True, help="Autor der importierten Rezepte")
+@with_appcontext
+def import_recipes(source, user_id):
+    """Rezepte aus NDJSON importieren (Datei oder stdin)."""
+    result = bulk.import_ndjson(source, user_id)
+    for error in result["errors"]:
+        click.echo(f"Zeile {error['line']}: {error['error']}", err=True)
+    click.echo(f"{result['inserted']} importiert, {result['failed']} fehlerhaft")
+
+
+@click.command("check-query-plans")
+@click.option("--verbose", "-v", is_flag=True, help="Pläne aller Queries ausgeben")
+@with_appcontext
+def check_query_plans(verbose):
+    """EXPLAIN QUERY PLAN für alle Hot-Queries; Exit-Code 1 bei Full Scan oder Sortierung ohne Index."""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("check-query-plans unterstützt nur SQLite")
+    failed = 0
+    for name, plan, problems in queryplans.check_all():
+        if problems:
+            failed += 1
+            click.echo(f"FEHLER {name}: {'; '.join(problems)}", err=True)
+        elif verbose:
+            click.echo(f"OK {name}")
+        if verbose or problems:
+            for line in plan:
+                click.echo(f"    {line}")
+    if failed:
+        raise click.ClickException(f"{failed} Queries ohne passenden Index")
+    click.echo("Alle Queries nutzen einen Index")
+
+
+@click.command("trending-rebuild")
+@with_appcontext
+def trending_rebuild():
+    """Trending-Scores aus Bewertungen, Favoriten und Kommentaren neu berechnen und sichern."""
+    count = trending.rebuild()
+    trending.save(replace=True)
+    click.echo(f"{count} Rezepte mit Trending-Score")
+
+
+@click.command("activity-rebuild")
+@with_appcontext
+def activity_rebuild():
+    """Rezept-, Favoriten-, Kommentar- und Bewertungszähler aller User neu berechnen."""
+    users = activity.rebuild()
+    db.session.commit()
+    click.echo(f"Zähler für {users} User neu berechnet")
+
+
+def register_commands(app):
+    app.cli.add_command(recount_ratings)
+    app.cli.add_command(search_rebuild)
+    app.cli.add_command(ingredients_rebuild)
+    app.cli.add_command(facets_rebuild)
+    app.cli.add_command(build_similar)
+    app.cli.add_command(export_recipes)
+    app.cli.add_command(import_recipes)
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(trending_rebuild)
+    app.cli.add_command(activity_rebuild)
@@ -0,0 +1,51 @@
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+READ_BIND = "replica"
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(Session):
+    """Session, die SELECTs lesender Requests (GET/HEAD) an die Read-Engine schickt.
+
+    Alles andere (Schreibzugriffe, Flushes, Text-SQL/DDL) läuft über die primäre Engine.
+    Aktiv nur, wenn SQLALCHEMY_BINDS eine "replica" enthält und DB_ROUTE_READS gesetzt ist.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and isinstance(clause, Select) and _route_reads():
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _route_reads():
+    return (
+        has_request_context()
+        and request.method in READ_METHODS
+        and current_app.config.get("DB_ROUTE_READS", False)
+    )
+
+
+def _sqlite_pragmas(pragmas, read_only=False):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+    return on_connect
+
+
+def init_app(app, db):
+    # Pragmas (WAL, busy_timeout, ...) für jede neue SQLite-Verbindung setzen
+    pragmas = app.config.get("SQLITE_PRAGMAS", {})
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            event.listen(engine, "connect", _sqlite_pragmas(pragmas, read_only=bind_key == READ_BIND))
@@ -0,0 +1,253 @@
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from . import db
+from .models import Recipe
+from .serializers import dumps_bytes, comment_schema
+
+# Letzte Ereignisse pro Rezept, für die Wiederaufnahme per Last-Event-ID
+BUFFER = 100
+# Rezepte mit Puffer (LRU); ältere Kanäle fallen weg, ihre Clients bekommen "reset"
+MAX_CHANNELS = 1000
+# Kommentarzeile in Ruhephasen, damit Proxies die Verbindung nicht schließen
+HEARTBEAT = 15
+# Wartezeit, die der Browser nach einem Verbindungsabbruch einhält (ms)
+RETRY_MS = 1000
+
+# Event-IDs gelten nur in diesem Prozess; IDs anderer Worker/Neustarts erkennen
+_instance = uuid.uuid4().hex[:8]
+_broker = None
+
+
+class TooManySubscribers(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Zu viele offene Event-Streams")
+        self.retry_after = retry_after
+
+
+class _Channel:
+    def __init__(self):
+        self.events = deque(maxlen=BUFFER)
+        self.wakers = set()
+        # Höchste Event-ID, die aus dem Puffer gefallen ist
+        self.dropped = 0
+
+    @property
+    def last(self):
+        return self.events[-1][0] if self.events else self.dropped
+
+
+class Broker:
+    """Prozessinterner Pub/Sub pro Rezept mit Ringpuffer und begrenzter Abonnentenzahl."""
+
+    def __init__(self, max_subscribers=200, max_seconds=300, retry_after=5):
+        self.max_subscribers = max_subscribers
+        self.max_seconds = max_seconds
+        self.retry_after = retry_after
+        self.subscribers = 0
+        self.published = 0
+        self._seq = itertools.count(1)
+        self._last = 0
+        # Höchste Event-ID aus verdrängten Kanälen
+        self._forgotten = 0
+        self._channels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _channel(self, recipe_id):
+        channel = self._channels.get(recipe_id)
+        if channel is None:
+            channel = self._channels[recipe_id] = _Channel()
+            # Nur Kanäle ohne Abonnenten verdrängen
+            for key in list(self._channels):
+                if len(self._channels) <= MAX_CHANNELS:
+                    break
+                if not self._channels[key].wakers:
+                    self._forgotten = max(self._forgotten, self._channels.pop(key).last)
+        self._channels.move_to_end(recipe_id)
+        return channel
+
+    def listening(self, recipe_ids):
+        """IDs mit Kanal; für die übrigen lohnt es nicht, Event-Daten zu laden."""
+        with self._lock:
+            return {rid for rid in recipe_ids if rid in self._channels}
+
+    def publish(self, recipe_id, kind, data):
+        with self._lock:
+            seq = self._last = next(self._seq)
+            channel = self._channels.get(recipe_id)
+            if channel is None:
+                # Niemand hört zu; wer mit älterer Last-Event-ID zurückkommt, bekommt "reset"
+                self._forgotten = seq
+                return
+            self._channels.move_to_end(recipe_id)
+            if len(channel.events) == BUFFER:
+                channel.dropped = channel.events[0][0]
+            channel.events.append((seq, kind, data))
+            wakers = list(channel.wakers)
+            self.published += 1
+        for wake in wakers:
+            wake()
+
+    def subscribe(self, recipe_id, last_event_id=None):
+        with self._lock:
+            if self.subscribers >= self.max_subscribers:
+                raise TooManySubscribers(self.retry_after)
+            self.subscribers += 1
+            start, reset = self._last, False
+            if last_event_id:
+                instance, _, seq = last_event_id.partition(":")
+                if instance == _instance and seq.isdigit() and int(seq) <= self._last:
+                    start = int(seq)
+                    # Verpasste Ereignisse nicht mehr im Puffer: Client muss neu laden
+                    channel = self._channels.get(recipe_id)
+                    dropped = channel.dropped if channel is not None else self._forgotten
+                    reset = dropped > start
+                else:
+                    reset = True
+        return Stream(self, recipe_id, start, reset)
+
+    def _after(self, recipe_id, seq):
+        with self._lock:
+            channel = self._channels.get(recipe_id)
+            if channel is None:
+                return []
+            return [event for event in channel.events if event[0] > seq]
+
+    def _watch(self, recipe_id, wake):
+        with self._lock:
+            self._channel(recipe_id).wakers.add(wake)
+
+    def _unwatch(self, recipe_id, wake):
+        with self._lock:
+            channel = self._channels.get(recipe_id)
+            if channel is not None:
+                channel.wakers.discard(wake)
+
+    def _release(self):
+        with self._lock:
+            self.subscribers -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": self.subscribers, "channels": len(self._channels), "published": self.published}
+
+
+def _format(seq, kind, data):
+    return b"id: %s:%d\nevent: %s\ndata: %s\n\n" % (_instance.encode(), seq, kind.encode(), dumps_bytes(data))
+
+
+class Stream:
+    """Body einer text/event-stream-Antwort, blockierend (WSGI) oder per async for (ASGI).
+
+    Endet nach max_seconds; der Browser verbindet sich mit Last-Event-ID neu.
+    """
+
+    def __init__(self, broker, recipe_id, start, reset):
+        self.broker = broker
+        self.recipe_id = recipe_id
+        self.position = start
+        self.reset = reset
+        self._closed = False
+
+    def _opening(self):
+        chunk = b"retry: %d\n\n" % RETRY_MS
+        if self.reset:
+            chunk += _format(self.position, "reset", {"recipe_id": self.recipe_id})
+        return chunk
+
+    def _pending(self):
+        events = self.broker._after(self.recipe_id, self.position)
+        if not events:
+            return b""
+        self.position = events[-1][0]
+        return b"".join(_format(*event) for event in events)
+
+    def __iter__(self):
+        ready = threading.Event()
+        self.broker._watch(self.recipe_id, ready.set)
+        try:
+            yield self._opening()
+            deadline = time.monotonic() + self.broker.max_seconds
+            while time.monotonic() < deadline:
+                ready.clear()
+                chunk = self._pending()
+                if chunk:
+                    yield chunk
+                elif not ready.wait(min(HEARTBEAT, max(deadline - time.monotonic(), 0))):
+                    yield b": keepalive\n\n"
+        finally:
+            self.broker._unwatch(self.recipe_id, ready.set)
+            self.close()
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(ready.set)
+
+        self.broker._watch(self.recipe_id, wake)
+        try:
+            yield self._opening()
+            deadline = time.monotonic() + self.broker.max_seconds
+            while time.monotonic() < deadline:
+                ready.clear()
+                chunk = self._pending()
+                if chunk:
+                    yield chunk
+                    continue
+                try:
+                    await asyncio.wait_for(ready.wait(), min(HEARTBEAT, max(deadline - time.monotonic(), 0)))
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.broker._unwatch(self.recipe_id, wake)
+            self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.broker._release()
+
+
+def init_app(app):
+    global _broker
+    _broker = Broker(
+        max_subscribers=app.config.get("EVENTS_MAX_SUBSCRIBERS", 200),
+        max_seconds=app.config.get("EVENTS_MAX_SECONDS", 300),
+        retry_after=app.config.get("EVENTS_RETRY_AFTER", 5),
+    )
+
+
+def publish(recipe_id, kind, data):
+    if _broker is not None:
+        _broker.publish(recipe_id, kind, data)
+
+
+def comment_added(comment, username):
+    publish(comment.recipe_id, "comment", dict(comment_schema.dump(comment), username=username))
+
+
+def ratings_changed(recipe_ids):
+    """Neue Aggregate senden; erst nach dem Commit aufrufen."""
+    recipe_ids = _broker.listening(recipe_ids) if _broker is not None else ()
+    if not recipe_ids:
+        return
+    rows = db.session.query(Recipe.id, Recipe.rating_sum, Recipe.rating_votes).filter(Recipe.id.in_(recipe_ids))
+    for row in rows:
+        votes = row.rating_votes or 0
+        publish(row.id, "rating", {
+            "average": round(row.rating_sum / votes, 1) if votes else 0,
+            "count": votes,
+        })
+
+
+def subscribe(recipe_id, last_event_id=None):
+    return _broker.subscribe(recipe_id, last_event_id)
+
+
+def stats():
+    return _broker.stats() if _broker is not None else {"subscribers": 0, "channels": 0, "published": 0}
@@ -0,0 +1,147 @@
+from sqlalchemy import event, inspect
+from . import db
+from .models import Recipe, Facet
+
+KINDS = ("category", "difficulty", "duration")
+# Dauer-Buckets: (Schlüssel, Label, von, bis) in Minuten, jeweils inklusive
+DURATION_BUCKETS = (
+    ("0-15", "bis 15 Min.", None, 15),
+    ("16-30", "16–30 Min.", 16, 30),
+    ("31-60", "31–60 Min.", 31, 60),
+    ("61-120", "1–2 Std.", 61, 120),
+    ("120+", "über 2 Std.", 121, None),
+)
+_LABELS = {key: label for key, label, _, _ in DURATION_BUCKETS}
+_ORDER = {key: i for i, (key, _, _, _) in enumerate(DURATION_BUCKETS)}
+_FIELDS = ("category", "difficulty", "duration_min")
+
+
+def duration_bucket(minutes):
+    # Werte aus JSON-Bodies können Strings sein ("45"); Unbrauchbares fällt aus den Facetten
+    if minutes is None or isinstance(minutes, bool):
+        return None
+    try:
+        minutes = int(minutes)
+    except (TypeError, ValueError):
+        return None
+    for key, _, _, high in DURATION_BUCKETS:
+        if high is None or minutes <= high:
+            return key
+
+
+def _values(category, difficulty, duration_min):
+    pairs = (("category", category), ("difficulty", difficulty), ("duration", duration_bucket(duration_min)))
+    return {(kind, str(value)[:64]) for kind, value in pairs if value}
+
+
+def _stored_values(session, recipe_id):
+    # Stand in der Datenbank vor diesem Flush
+    row = session.execute(
+        db.select(Recipe.category, Recipe.difficulty, Recipe.duration_min).where(Recipe.id == recipe_id)
+    ).first()
+    return _values(*row) if row else set()
+
+
+def _changed(recipe):
+    state = inspect(recipe)
+    return any(state.attrs[name].history.has_changes() for name in _FIELDS)
+
+
+def _before_flush(session, flush_context, instances):
+    # Zähler in derselben Transaktion wie die Rezeptänderung anpassen
+    deltas = {}
+
+    def add(values, delta):
+        for key in values:
+            deltas[key] = deltas.get(key, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, Recipe):
+            add(_values(obj.category, obj.difficulty, obj.duration_min), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Recipe) and obj not in session.deleted and _changed(obj):
+            add(_stored_values(session, obj.id), -1)
+            add(_values(obj.category, obj.difficulty, obj.duration_min), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Recipe):
+            add(_stored_values(session, obj.id), -1)
+    _apply(session, {key: delta for key, delta in deltas.items() if delta})
+
+
+def _apply(session, deltas):
+    for (kind, value), delta in deltas.items():
+        updated = session.execute(
+            db.update(Facet).where(Facet.kind == kind, Facet.value == value).values(count=Facet.count + delta)
+        ).rowcount
+        if not updated and delta > 0:
+            session.execute(db.insert(Facet).values(kind=kind, value=value, count=delta))
+    if any(delta < 0 for delta in deltas.values()):
+        session.execute(db.delete(Facet).where(Facet.count <= 0))
+
+
+def init_app(app):
+    if not event.contains(db.session, "before_flush", _before_flush):
+        event.listen(db.session, "before_flush", _before_flush)
+
+
+def duration_expression():
+    return db.case(
+        *[
+            (Recipe.duration_min <= high if high is not None else Recipe.duration_min >= low, key)
+            for key, _, low, high in DURATION_BUCKETS
+        ],
+        else_=None,
+    )
+
+
+def rebuild():
+    """Zähler komplett aus der Rezept-Tabelle neu aufbauen (Backfill / Reparatur)."""
+    Facet.query.delete(synchronize_session=False)
+    rows = []
+    for kind, column in (("category", Recipe.category), ("difficulty", Recipe.difficulty), ("duration", duration_expression())):
+        counts = db.session.query(column, db.func.count()).filter(column.isnot(None), column != "").group_by(column)
+        rows += [{"kind": kind, "value": str(value)[:64], "count": count} for value, count in counts]
+    if rows:
+        db.session.execute(db.insert(Facet), rows)
+    return len(rows)
+
+
+def counts_query():
+    return Facet.query.filter(Facet.kind.in_(KINDS), Facet.count > 0).order_by(Facet.kind, Facet.value)
+
+
+def load():
+    """Alle Filterwerte mit Anzahl: {kind: [{"value", "label", "count"}, ...]}.
+
+    Eine Query über den Primärschlüssel, unabhängig von der Anzahl der Rezepte.
+    """
+    facets = {kind: [] for kind in KINDS}
+    for f in counts_query():
+        facets[f.kind].append({"value": f.value, "label": _LABELS.get(f.value, f.value), "count": f.count})
+    facets["duration"].sort(key=lambda item: _ORDER.get(item["value"], len(_ORDER)))
+    return facets
+
+
+def selected(args):
+    # Mehrfachauswahl pro Facette (?category=A&category=B), leere Werte ignorieren
+    return {kind: [v for v in args.getlist(kind) if v] for kind in KINDS}
+
+
+def apply_filters(query, selection):
+    """Innerhalb einer Facette ODER, zwischen Facetten UND."""
+    if selection.get("category"):
+        query = query.filter(Recipe.category.in_(selection["category"]))
+    if selection.get("difficulty"):
+        query = query.filter(Recipe.difficulty.in_(selection["difficulty"]))
+    ranges = []
+    for key, _, low, high in DURATION_BUCKETS:
+        if key in selection.get("duration", ()):
+            condition = Recipe.duration_min.isnot(None)
+            if low is not None:
+                condition = db.and_(condition, Recipe.duration_min >= low)
+            if high is not None:
+                condition = db.and_(condition, Recipe.duration_min <= high)
+            ranges.append(condition)
+    if ranges:
+        query = query.filter(db.or_(*ranges))
+    return query
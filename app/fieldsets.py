@@ -0,0 +1,140 @@
+from sqlalchemy.orm import load_only
+from . import db
+from .serializers import recipe_schema, comment_schema, author_schema
+from .models import Recipe, User, Comment
+
+# Felder, die per ?fields= angefordert werden können (Name -> Spalte)
+COLUMNS = {
+    "id": Recipe.id,
+    "title": Recipe.title,
+    "description": Recipe.description,
+    "ingredients": Recipe.ingredients,
+    "steps": Recipe.steps,
+    "category": Recipe.category,
+    "duration_min": Recipe.duration_min,
+    "difficulty": Recipe.difficulty,
+    "image_url": Recipe.image_url,
+    "created_by": Recipe.created_by,
+    "created_at": Recipe.created_at,
+    "updated_at": Recipe.updated_at,
+    "version": Recipe.version,
+}
+# Abgeleitete Felder und die Spalten, die sie brauchen
+COMPUTED = {
+    "images": (Recipe.image_url,),
+    "thumbnail_url": (Recipe.image_url,),
+}
+INCLUDES = {
+    "author": (Recipe.created_by,),
+    "rating_summary": (Recipe.rating_sum, Recipe.rating_votes),
+    "comments": (),
+}
+
+LIST_FIELDS = ("id", "title", "category", "duration_min")
+DETAIL_FIELDS = (
+    "id", "title", "description", "ingredients", "steps", "category",
+    "duration_min", "difficulty", "image_url", "images",
+)
+FAVORITE_FIELDS = ("id", "title", "image_url", "thumbnail_url")
+# Eingebettete Kommentare pro Rezept (die neuesten); mehr über /recipes/<id>/comments
+EMBEDDED_COMMENTS = 5
+
+
+class InvalidFieldset(ValueError):
+    pass
+
+
+def _names(value):
+    return [n.strip() for n in (value or "").split(",") if n.strip()]
+
+
+def parse_fields(value, default):
+    if not value:
+        return tuple(default)
+    fields = _names(value)
+    unknown = [f for f in fields if f not in COLUMNS and f not in COMPUTED]
+    if unknown:
+        raise InvalidFieldset(f"Unknown fields: {', '.join(unknown)}")
+    # id wird immer geliefert, sonst lassen sich die Objekte nicht zuordnen
+    return tuple(dict.fromkeys(["id"] + fields))
+
+
+def parse_includes(value):
+    includes = _names(value)
+    unknown = [i for i in includes if i not in INCLUDES]
+    if unknown:
+        raise InvalidFieldset(f"Unknown includes: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(includes))
+
+
+def parse_ids(value, limit):
+    try:
+        ids = [int(i) for i in _names(value)]
+    except ValueError:
+        raise InvalidFieldset("ids must be integers")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > limit:
+        raise InvalidFieldset(f"At most {limit} ids per request")
+    return ids
+
+
+def load_options(fields, includes=()):
+    """load_only() für genau die Spalten, die Felder und Includes brauchen.
+
+    version bleibt immer geladen, sie steckt in den ETags.
+    """
+    columns = {Recipe.id, Recipe.version}
+    for name in fields:
+        columns.update((COLUMNS[name],) if name in COLUMNS else COMPUTED[name])
+    for name in includes:
+        columns.update(INCLUDES[name])
+    return load_only(*columns)
+
+
+def _authors(recipes):
+    author_ids = {r.created_by for r in recipes if r.created_by is not None}
+    if not author_ids:
+        return {}
+    rows = db.session.query(User.id, User.username).filter(User.id.in_(author_ids)).all()
+    return {row.id: author_schema.dump(row) for row in rows}
+
+
+def latest_comments_query(recipe_ids):
+    # Neueste Kommentare aller Rezepte in einer Query (Fensterfunktion, Index recipe_id, created_at)
+    position = db.func.row_number().over(
+        partition_by=Comment.recipe_id, order_by=(Comment.created_at.desc(), Comment.id.desc())
+    ).label("position")
+    ranked = (
+        db.session.query(Comment.id, Comment.recipe_id, Comment.user_id, Comment.text, Comment.created_at, position)
+        .filter(Comment.recipe_id.in_(recipe_ids))
+        .subquery()
+    )
+    return db.session.query(ranked).filter(ranked.c.position <= EMBEDDED_COMMENTS).order_by(
+        ranked.c.recipe_id, ranked.c.position
+    )
+
+
+def _latest_comments(recipe_ids):
+    comments = {}
+    for row in latest_comments_query(recipe_ids):
+        comments.setdefault(row.recipe_id, []).append(comment_schema.dump(row))
+    return comments
+
+
+def serialize(recipes, fields, includes=()):
+    """Rezepte als dicts; jedes Include kostet höchstens eine Query für alle Rezepte."""
+    recipes = list(recipes)
+    authors = _authors(recipes) if "author" in includes else {}
+    comments = _latest_comments([r.id for r in recipes]) if "comments" in includes and recipes else {}
+
+    data = []
+    for r in recipes:
+        item = recipe_schema.dump(r, fields)
+        if "author" in includes:
+            item["author"] = authors.get(r.created_by)
+        if "rating_summary" in includes:
+            item["rating_summary"] = {"average": r.average_rating(), "count": r.rating_count()}
+        if "comments" in includes:
+            item["comments"] = comments.get(r.id, [])
+        data.append(item)
+    return data
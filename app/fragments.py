@@ -0,0 +1,46 @@
+from flask import render_template
+from markupsafe import Markup
+from .cache import TTLCache
+from .cards import load_recipe_cards
+
+# Gerenderte Template-Fragmente (Rezeptkarten, statischer Teil der Detailseite).
+# Schlüssel enthalten Rezept-ID und Version; Bearbeiten, Bewerten, Kommentieren und
+# Favorisieren erhöhen die Version, alte Einträge verdrängt die LRU-Grenze.
+# Die TTL deckt nur nicht versionierte Daten ab (z.B. ein geänderter Autorname).
+_cache = TTLCache(maxsize=0)
+
+
+def init_app(app):
+    global _cache
+    _cache = TTLCache(
+        maxsize=app.config.get("FRAGMENT_CACHE_SIZE", 5000),
+        ttl=app.config.get("FRAGMENT_CACHE_TTL", 3600),
+    )
+
+
+def render(template, key, **context):
+    """Rendert template einmal pro key; nutzerspezifisches gehört nicht in den Kontext."""
+    key = (template,) + tuple(key)
+    html = _cache.get(key)
+    if html is None:
+        html = Markup(render_template(template, **context))
+        _cache.set(key, html)
+    return html
+
+
+def recipe_cards(recipes, template, **context):
+    """[(recipe, html)] in der Reihenfolge von recipes.
+
+    Autoren und Zähler (load_recipe_cards) werden nur für Cache-Misses geladen.
+    """
+    recipes = list(recipes)
+    keys = {r.id: (template, r.id, r.version) + tuple(sorted(context.items())) for r in recipes}
+    html = {r.id: _cache.get(keys[r.id]) for r in recipes}
+    for card in load_recipe_cards([r for r in recipes if html[r.id] is None]):
+        html[card.recipe.id] = Markup(render_template(template, card=card, recipe=card.recipe, **context))
+        _cache.set(keys[card.recipe.id], html[card.recipe.id])
+    return [(r, html[r.id]) for r in recipes]
+
+
+def stats():
+    return _cache.stats()
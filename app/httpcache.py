@@ -0,0 +1,110 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request, abort
+from sqlalchemy import event
+from . import db
+from .cache import TTLCache
+from .models import Recipe, Comment, Rating, Favorite
+
+# Generationszähler pro Tag ("recipes" für Listen, Rezept-ID für Einzelressourcen).
+# Ein Commit in diesem Prozess erhöht die Generation, alte Cache-Einträge werden
+# damit unerreichbar; andere Prozesse sehen Änderungen spätestens nach der TTL.
+_generations = {}
+LIST_TAG = "recipes"
+
+
+def generation(tag):
+    return _generations.get(tag, 0)
+
+
+def _changed_recipes(session):
+    return session.info.setdefault("changed_recipes", set())
+
+
+def mark_changed(session, recipe_ids):
+    # Für Core-Statements (Bulk-Upserts), die after_flush nicht sieht
+    _changed_recipes(session).update(recipe_ids)
+
+
+def _after_flush(session, flush_context):
+    changed = _changed_recipes(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Recipe):
+            changed.add(obj.id)
+        elif isinstance(obj, (Comment, Rating, Favorite)):
+            changed.add(obj.recipe_id)
+
+
+def _after_commit(session):
+    changed = session.info.pop("changed_recipes", None)
+    if not changed:
+        return
+    for recipe_id in changed:
+        _generations[recipe_id] = generation(recipe_id) + 1
+    _generations[LIST_TAG] = generation(LIST_TAG) + 1
+
+
+def _after_rollback(session):
+    session.info.pop("changed_recipes", None)
+
+
+def init_app(app):
+    app.extensions["httpcache"] = TTLCache(
+        maxsize=app.config.get("API_RESPONSE_CACHE_SIZE", 0),
+        ttl=app.config.get("API_RESPONSE_CACHE_TTL", 30),
+    )
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_rollback", _after_rollback)
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+
+
+def _is_fresh(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _response(etag, last_modified, body=None):
+    if body is None:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers["Cache-Control"] = f"public, max-age={current_app.config.get('API_CACHE_MAX_AGE', 0)}, must-revalidate"
+    return response
+
+
+def conditional(tags, validator, build):
+    """Bedingte JSON-Antwort mit ETag / Last-Modified.
+
+    validator() liefert (etag, last_modified) aus einer leichten Query oder None für 404,
+    build() erzeugt den Body (dict) und wird bei 304 oder Cache-Treffer nicht aufgerufen.
+    """
+    cache = current_app.extensions["httpcache"]
+    key = (request.endpoint, request.full_path, tuple(generation(t) for t in tags))
+    entry = cache.get(key) if cache.maxsize else None
+
+    if entry is None:
+        validated = validator()
+        if validated is None:
+            abort(404)
+        etag, last_modified = validated
+        if _is_fresh(etag, last_modified):
+            return _response(etag, last_modified)
+        body = current_app.json.dumps(build())
+        entry = (etag, last_modified, body)
+        cache.set(key, entry)
+
+    etag, last_modified, body = entry
+    if _is_fresh(etag, last_modified):
+        return _response(etag, last_modified)
+    return _response(etag, last_modified, body)
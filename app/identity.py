@@ -0,0 +1,69 @@
+import time
+import jwt
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from . import db
+from .cache import TTLCache
+from .models import User
+
+# Cache für dekodierte Tokens und User-Identitäten, damit authentifizierte
+# Requests im Normalfall weder jwt.decode noch die user-Tabelle brauchen.
+_tokens = TTLCache(maxsize=0)
+_users = TTLCache(maxsize=0)
+
+
+def init_app(app):
+    global _tokens, _users
+    size = app.config.get("IDENTITY_CACHE_SIZE", 10000)
+    ttl = app.config.get("IDENTITY_CACHE_TTL", 60)
+    _tokens = TTLCache(maxsize=size, ttl=ttl)
+    _users = TTLCache(maxsize=size, ttl=ttl)
+    if not event.contains(User, "after_update", _evict):
+        event.listen(User, "after_update", _evict)
+        event.listen(User, "after_delete", _evict)
+
+
+def _evict(mapper, connection, user):
+    _users.pop(user.id)
+
+
+def invalidate_user(user_id):
+    # Für Änderungen an User-Zeilen an der Session vorbei (Bulk-UPDATE); ORM-Änderungen erledigt _evict
+    _users.pop(user_id)
+
+
+def invalidate_all():
+    _users.clear()
+
+
+def decode_token(token):
+    payload = _tokens.get(token)
+    if payload is None:
+        payload = jwt.decode(token, current_app.config["JWT_SECRET"], algorithms=["HS256"])
+        # Nie länger cachen, als das Token gültig ist
+        ttl = min(_tokens.ttl, payload.get("exp", 0) - time.time()) if "exp" in payload else _tokens.ttl
+        if ttl > 0:
+            _tokens.set(token, payload, ttl)
+    return payload
+
+
+def _snapshot(user):
+    # Losgelöste Kopie mit Identität, per merge(load=False) ohne SELECT wieder einhängbar
+    copy = User(**{c.key: getattr(user, c.key) for c in User.__mapper__.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def load_user(user_id):
+    cached = _users.get(user_id)
+    if cached is not None:
+        return db.session.merge(cached, load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        _users.set(user_id, _snapshot(user))
+    return user
+
+
+def stats():
+    return {"tokens": _tokens.stats(), "users": _users.stats()}
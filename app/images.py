@@ -0,0 +1,146 @@
+import atexit
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, request
+from . import db
+from .models import Recipe
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow optional, dann werden nur Originale gespeichert
+    Image = None
+
+log = logging.getLogger(__name__)
+
+# Maximale Kantenlänge je Variante
+VARIANTS = {"thumb": 320, "card": 640, "large": 1280}
+PLACEHOLDER = "https://images.unsplash.com/photo-1504674900247-0877df9cc836?q=80&w={width}&auto=format&fit=crop"
+URL_PREFIX = "/static/uploads/"
+# Inhaltsadressierte Namen: <sha256>.<ext> bzw. <sha256>_<variante>.jpg
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(_[a-z]+)?\.[a-z]+$")
+
+_executor = None
+_existing = set()
+
+
+def init_app(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config.get("IMAGE_WORKERS", 2), thread_name_prefix="images")
+        atexit.register(_executor.shutdown, wait=True)
+    app.jinja_env.globals["recipe_image"] = recipe_image
+    app.after_request(_cache_headers)
+
+
+def _cache_headers(response):
+    # Gehashte Dateien ändern sich nie, dürfen also dauerhaft gecacht werden
+    if request.path.startswith(URL_PREFIX) and response.status_code == 200:
+        if HASHED_NAME.match(request.path[len(URL_PREFIX):]):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def _variant_name(digest, variant):
+    return f"{digest}_{variant}.jpg"
+
+
+def save_upload(file, extension):
+    """Speichert einen Upload unter seinem SHA-256 und stößt die Varianten-Erzeugung an.
+
+    Identische Uploads landen in derselben Datei. Gibt die URL des Originals zurück.
+    """
+    folder = current_app.config["UPLOAD_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    with os.fdopen(fd, "wb") as out:
+        for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+            digest.update(chunk)
+            out.write(chunk)
+    digest = digest.hexdigest()
+
+    filename = f"{digest}.{extension}"
+    path = os.path.join(folder, filename)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+
+    url = URL_PREFIX + filename
+    if Image is not None and not all(os.path.exists(os.path.join(folder, _variant_name(digest, v))) for v in VARIANTS):
+        _executor.submit(_process, current_app._get_current_object(), path, digest, url)
+    return url
+
+
+def _process(app, path, digest, url):
+    folder = os.path.dirname(path)
+    try:
+        with Image.open(path) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            for variant, size in VARIANTS.items():
+                target = os.path.join(folder, _variant_name(digest, variant))
+                if os.path.exists(target):
+                    continue
+                copy = img.copy()
+                copy.thumbnail((size, size), Image.LANCZOS)
+                tmp = target + ".part"
+                copy.save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+                os.replace(tmp, target)
+    except Exception:
+        log.exception("Bildvarianten für %s konnten nicht erzeugt werden", path)
+        return
+
+    # Versionen erhöhen, damit ETags/Caches die neuen Varianten ausliefern
+    with app.app_context():
+        Recipe.query.filter_by(image_url=url).update({Recipe.version: Recipe.version + 1}, synchronize_session=False)
+        db.session.commit()
+
+
+def recipe_image(url, variant="card"):
+    """URL der passenden Bildvariante; fällt auf das Original bzw. den Platzhalter zurück."""
+    if not url:
+        return PLACEHOLDER.format(width=VARIANTS.get(variant, 1280))
+    if not url.startswith(URL_PREFIX) or variant not in VARIANTS:
+        return url
+    name = url[len(URL_PREFIX):]
+    if not HASHED_NAME.match(name):
+        return url
+    variant_name = _variant_name(name.split(".", 1)[0], variant)
+    if variant_name not in _existing:
+        if not os.path.exists(os.path.join(current_app.config["UPLOAD_FOLDER"], variant_name)):
+            return url
+        _existing.add(variant_name)
+    return URL_PREFIX + variant_name
+
+
+def other_users_query(url, recipe_id):
+    # Andere Rezepte mit demselben (inhaltsadressierten) Bild
+    return Recipe.query.filter(Recipe.image_url == url, Recipe.id != recipe_id)
+
+
+def discard(url, recipe_id):
+    # Datei nur löschen, wenn kein anderes Rezept denselben Inhalt verwendet
+    if not url:
+        return
+    if other_users_query(url, recipe_id).first() is not None:
+        return
+    folder = current_app.config["UPLOAD_FOLDER"]
+    name = url[len(URL_PREFIX):] if url.startswith(URL_PREFIX) else os.path.basename(url)
+    paths = [os.path.join(folder, name)]
+    if HASHED_NAME.match(name):
+        digest = name.split(".", 1)[0]
+        paths += [os.path.join(folder, _variant_name(digest, v)) for v in VARIANTS]
+    for path in paths:
+        _existing.discard(os.path.basename(path))
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,21 @@
+from . import search, ingredients, similar
+
+# Zentrale Hooks für alle abgeleiteten Rezept-Indizes (Volltext, Zutaten, Ähnlichkeiten).
+# Werden vor dem Commit aufgerufen und laufen in derselben Transaktion.
+
+
+def recipe_saved(recipe):
+    search.index_recipe(recipe)
+    ingredients.index_recipe(recipe)
+
+
+def recipes_created(recipes):
+    # Frisch geflushte Rezepte, z.B. aus dem Bulk-Import
+    search.index_recipes(recipes)
+    ingredients.index_recipes(recipes, replace=False)
+
+
+def recipe_deleted(recipe_id):
+    search.remove_recipe(recipe_id)
+    ingredients.remove_recipe(recipe_id)
+    similar.remove_recipe(recipe_id)
@@ -0,0 +1,142 @@
+import re
+from . import db
+from .models import Recipe, Ingredient, RecipeIngredient
+
+MAX_PANTRY_TERMS = 30
+
+# Mengen, Einheiten und Füllwörter, die keine Zutat beschreiben
+UNITS = {
+    "g", "gr", "kg", "mg", "ml", "cl", "dl", "l", "el", "tl", "msp", "prise", "prisen",
+    "essl", "teel", "esslöffel", "teelöffel", "tasse", "tassen", "becher", "dose",
+    "dosen", "packung", "packungen", "pck", "pkg", "päckchen", "bund", "stück", "stk",
+    "scheibe", "scheiben", "zehe", "zehen", "glas", "handvoll", "cup", "cups", "tbsp",
+    "tsp", "oz", "lb", "lbs", "pinch", "clove", "cloves", "slice", "slices", "can",
+}
+STOPWORDS = {
+    "und", "oder", "etwas", "evtl", "nach", "belieben", "frisch", "frische", "frischer",
+    "gehackt", "gerieben", "klein", "kleine", "große", "groß", "mittel", "ca", "zum",
+    "für", "den", "die", "das", "der", "von", "mit", "and", "or", "of", "a", "an",
+    "some", "fresh", "chopped", "to", "taste", "large", "small", "optional",
+}
+_SPLIT_RE = re.compile(r"[\n;]+")
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_PAREN_RE = re.compile(r"\([^)]*\)")
+
+
+def parse_line(line):
+    # "200 g Hühnchenbrust (gewürfelt), frisch" -> ["hühnchenbrust"]
+    line = _PAREN_RE.sub(" ", line.lower()).split(",", 1)[0]
+    return [w for w in _WORD_RE.findall(line) if len(w) > 1 and w not in UNITS and w not in STOPWORDS]
+
+
+def parse_lines(text):
+    """Zerlegt den Zutaten-Freitext in (Anzahl Zeilen, Menge von (Zeilennummer, Begriff))."""
+    lines = [l for l in _SPLIT_RE.split(text or "") if l.strip()]
+    return len(lines), {(number, w[:64]) for number, line in enumerate(lines) for w in parse_line(line)}
+
+
+def parse(text):
+    """Zerlegt den Zutaten-Freitext in (Anzahl Zeilen, Menge normalisierter Begriffe)."""
+    count, postings = parse_lines(text)
+    return count, {term for _, term in postings}
+
+
+def normalize_pantry(items):
+    terms = []
+    for item in items:
+        for term in parse_line(item):
+            if term not in terms:
+                terms.append(term)
+    return terms[:MAX_PANTRY_TERMS]
+
+
+def _ingredient_ids(names, create=False):
+    if not names:
+        return {}
+    ids = dict(db.session.query(Ingredient.name, Ingredient.id).filter(Ingredient.name.in_(names)).all())
+    missing = [n for n in names if n not in ids]
+    if create and missing:
+        new = [Ingredient(name=n) for n in missing]
+        db.session.add_all(new)
+        db.session.flush()
+        ids.update((i.name, i.id) for i in new)
+    return ids
+
+
+def index_recipes(recipes, replace=True):
+    """Aktualisiert die Posting-Listen für bereits geflushte Rezepte."""
+    recipes = [r for r in recipes if r.id is not None]
+    if not recipes:
+        return
+    if replace:
+        RecipeIngredient.query.filter(
+            RecipeIngredient.recipe_id.in_([r.id for r in recipes])
+        ).delete(synchronize_session=False)
+
+    parsed = {}
+    vocabulary = set()
+    for r in recipes:
+        count, postings = parse_lines(r.ingredients)
+        r.ingredient_count = count
+        parsed[r.id] = postings
+        vocabulary.update(term for _, term in postings)
+
+    ids = _ingredient_ids(sorted(vocabulary), create=True)
+    rows = [
+        {"recipe_id": recipe_id, "ingredient_id": ids[term], "line": line}
+        for recipe_id, postings in parsed.items()
+        for line, term in postings
+    ]
+    if rows:
+        db.session.execute(RecipeIngredient.__table__.insert(), rows)
+
+
+def index_recipe(recipe):
+    if recipe.id is None:
+        db.session.flush()
+    index_recipes([recipe])
+
+
+def remove_recipe(recipe_id):
+    RecipeIngredient.query.filter_by(recipe_id=recipe_id).delete(synchronize_session=False)
+
+
+def rebuild_index(batch_size=1000):
+    RecipeIngredient.query.delete(synchronize_session=False)
+    last_id, total = 0, 0
+    while True:
+        recipes = Recipe.query.filter(Recipe.id > last_id).order_by(Recipe.id).limit(batch_size).all()
+        if not recipes:
+            return total
+        index_recipes(recipes, replace=False)
+        db.session.commit()
+        total += len(recipes)
+        last_id = recipes[-1].id
+
+
+def find_by_pantry(items, limit=20, require_all=False):
+    """Rezepte sortiert nach Abdeckung durch die Vorratsliste.
+
+    Schnittmenge über die Posting-Listen der Begriffe (Index ingredient_id, recipe_id, line);
+    Ergebnis: Liste von (Recipe, Anzahl abgedeckter Zutatenzeilen).
+    """
+    terms = normalize_pantry(items)
+    ids = list(_ingredient_ids(terms).values())
+    if not ids or (require_all and len(ids) < len(terms)):
+        return terms, []
+    return terms, pantry_query(ids, limit, require_all).all()
+
+
+def pantry_query(ingredient_ids, limit=20, require_all=False):
+    # Zeilen zählen, nicht Begriffe: "Olivenöl extra vergine" ist eine Zutat
+    matched = db.func.count(db.distinct(RecipeIngredient.line)).label("matched")
+    coverage = matched * 1.0 / db.case((Recipe.ingredient_count > 0, Recipe.ingredient_count), else_=1)
+    query = (
+        db.session.query(Recipe, matched)
+        .join(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id)
+        .filter(RecipeIngredient.ingredient_id.in_(ingredient_ids))
+        .group_by(Recipe.id)
+    )
+    if require_all:
+        query = query.having(db.func.count(db.distinct(RecipeIngredient.ingredient_id)) == len(ingredient_ids))
+    return query.order_by(coverage.desc(), matched.desc(), Recipe.id.desc()).limit(limit)
@@ -0,0 +1,218 @@
+import heapq
+import logging
+import threading
+import time
+from flask import g, request, has_request_context, template_rendered, before_render_template
+from sqlalchemy import event
+from .serializers import JSONProvider
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+SLOWEST_LOGGED = 3
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Registry:
+    """Prozessinterne Metriken pro Endpunkt, Ausgabe im Prometheus-Textformat."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.queries = {}
+        self.requests = {}
+        self.db_seconds = {}
+
+    def observe(self, endpoint, method, status, seconds, query_count, db_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(query_count)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + db_seconds
+            status_key = (endpoint, method, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+    def render(self, extra_gauges=None):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requests per endpoint, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (endpoint, method, status), value in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {value}')
+            lines += _histogram_lines(
+                "http_request_duration_seconds", "Request latency per endpoint.", self.latency
+            )
+            lines += _histogram_lines(
+                "db_queries_per_request", "SQL statements per request and endpoint.", self.queries
+            )
+            lines += [
+                "# HELP db_query_seconds_total Time spent in SQL per endpoint.",
+                "# TYPE db_query_seconds_total counter",
+            ]
+            for (endpoint, method), value in sorted(self.db_seconds.items()):
+                lines.append(f'db_query_seconds_total{{endpoint="{endpoint}",method="{method}"}} {value:.6f}')
+        for name, help_text, samples in extra_gauges or []:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name, help_text, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (endpoint, method), h in sorted(histograms.items()):
+        labels = f'endpoint="{endpoint}",method="{method}"'
+        for bound, count in zip(h.buckets, h.counts):
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+        lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return lines
+
+
+registry = Registry()
+
+
+class TimedJSONProvider(JSONProvider):
+    # Misst die JSON-Serialisierung pro Request (für Server-Timing "serialize")
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_timing("serialize", time.perf_counter() - started)
+
+
+def _stats():
+    if has_request_context():
+        return g.get("_metrics")
+    return None
+
+
+def add_timing(name, seconds):
+    stats = _stats()
+    if stats is not None:
+        stats[name] = stats.get(name, 0.0) + seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["_query_start"].pop()
+    stats = _stats()
+    if stats is None:
+        return
+    duration = time.perf_counter() - started
+    stats["db"] += duration
+    stats["queries"] += 1
+    # Nur die langsamsten Statements behalten, Speicher bleibt auch bei Bulk-Requests konstant
+    slowest = stats["slowest"]
+    if len(slowest) < SLOWEST_LOGGED:
+        heapq.heappush(slowest, (duration, statement))
+    elif duration > slowest[0][0]:
+        heapq.heapreplace(slowest, (duration, statement))
+
+
+def _handle_error(exception_context):
+    # Fehlgeschlagene Statements erreichen after_cursor_execute nicht
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("_query_start"):
+        conn.info["_query_start"].pop()
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None:
+        stats.setdefault("_render_start", []).append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None and stats.get("_render_start"):
+        stats["render"] += time.perf_counter() - stats["_render_start"].pop()
+
+
+def _start_request():
+    g._metrics = {
+        "start": time.perf_counter(),
+        "db": 0.0,
+        "queries": 0,
+        "slowest": [],
+        "render": 0.0,
+        "serialize": 0.0,
+    }
+
+
+def _finish_request(response):
+    stats = g.pop("_metrics", None)
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats["start"]
+    handler = max(total - stats["db"] - stats["render"] - stats["serialize"], 0.0)
+    response.headers["Server-Timing"] = ", ".join([
+        f'db;dur={stats["db"] * 1000:.2f};desc="{stats["queries"]} queries"',
+        f'render;dur={stats["render"] * 1000:.2f}',
+        f'serialize;dur={stats["serialize"] * 1000:.2f}',
+        f"app;dur={handler * 1000:.2f}",
+        f"total;dur={total * 1000:.2f}",
+    ])
+
+    endpoint = request.endpoint or "unmatched"
+    registry.observe(endpoint, request.method, response.status_code, total, stats["queries"], stats["db"])
+
+    slow_ms = g.get("_slow_ms")
+    if slow_ms is not None and total * 1000 >= slow_ms:
+        slowest = sorted(stats["slowest"], reverse=True)
+        log.warning(
+            "Langsamer Request %s %s (%s): %.1f ms, %d Queries (%.1f ms DB), Render %.1f ms; langsamste: %s",
+            request.method, request.path, endpoint, total * 1000, stats["queries"], stats["db"] * 1000,
+            stats["render"] * 1000,
+            " | ".join(f"{d * 1000:.1f} ms {' '.join(s.split())[:200]}" for d, s in slowest),
+        )
+    return response
+
+
+def init_app(app, db):
+    app.json = TimedJSONProvider(app)
+    slow_ms = app.config.get("SLOW_REQUEST_MS", 500)
+
+    @app.before_request
+    def start_metrics():
+        _start_request()
+        g._slow_ms = slow_ms
+
+    app.after_request(_finish_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument(engine)
+
+
+def instrument(engine):
+    # Query-Zeiten pro Request zählen (auch für die Engine der ASGI-Variante)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
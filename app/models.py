@@ -1,7 +1,6 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from . import db
+from . import db, passwords
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,16 +10,22 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Denormalisierte Zähler fürs Profil, gepflegt von app/activity.py
+    recipe_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     recipes = db.relationship("Recipe", backref="author", lazy="dynamic")
     comments = db.relationship("Comment", backref="author", lazy="dynamic")
     ratings = db.relationship("Rating", backref="author", lazy="dynamic")
     favorites = db.relationship("Favorite", backref="user", lazy="dynamic", cascade="all, delete-orphan")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
 
 class Recipe(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -34,19 +39,63 @@ class Recipe(db.Model):
     image_url = db.Column(db.String(255))
     created_by = db.Column(db.Integer, db.ForeignKey("user.id"))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Version für ETags/Caches, erhöht durch touch() und recount_ratings()
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Denormalisierte Bewertungs-Aggregate, gepflegt über recount_ratings()
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_votes = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_avg = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    # Anzahl Zutatenzeilen, Basis für die Abdeckung bei der Zutatensuche
+    ingredient_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     comments = db.relationship("Comment", backref="recipe", lazy="dynamic")
     ratings = db.relationship("Rating", backref="recipe", lazy="dynamic")
     favorites = db.relationship("Favorite", backref="recipe", lazy="dynamic", cascade="all, delete-orphan")
 
+    # Ein Index pro Zugriffsmuster; geprüft mit `flask check-query-plans`
+    __table_args__ = (
+        db.Index("ix_recipe_rating_avg", "rating_avg", "created_at"),
+        db.Index("ix_recipe_created_at_id", "created_at", "id"),
+        db.Index("ix_recipe_category_created_at", "category", "created_at"),
+        db.Index("ix_recipe_category_rating_avg", "category", "rating_avg", "created_at"),
+        db.Index("ix_recipe_created_by_created_at", "created_by", "created_at"),
+        db.Index("ix_recipe_image_url", "image_url"),
+    )
+
     def average_rating(self):
-        ratings = self.ratings.all()
-        if not ratings:
+        if not self.rating_votes:
             return 0
-        return round(sum(r.stars for r in ratings) / len(ratings), 1)
+        return round(self.rating_sum / self.rating_votes, 1)
 
     def rating_count(self):
-        return self.ratings.count()
+        return self.rating_votes or 0
+
+    @staticmethod
+    def touch(recipe_id):
+        # Version erhöhen bei Änderungen an Rezept, Kommentaren oder Favoriten
+        Recipe.query.filter_by(id=recipe_id).update({
+            Recipe.version: Recipe.version + 1,
+            Recipe.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
+
+    @staticmethod
+    def recount_ratings(recipe_ids=None):
+        # Aggregate aus der Rating-Tabelle neu berechnen: alle (Backfill / Reparatur) oder nur
+        # recipe_ids (Write-Behind, in derselben Transaktion wie die Bewertungen selbst)
+        stars_sum = db.select(db.func.coalesce(db.func.sum(Rating.stars), 0)).where(Rating.recipe_id == Recipe.id).scalar_subquery()
+        votes = db.select(db.func.count(Rating.id)).where(Rating.recipe_id == Recipe.id).scalar_subquery()
+        avg = db.select(db.func.coalesce(db.func.avg(Rating.stars), 0)).where(Rating.recipe_id == Recipe.id).scalar_subquery()
+        query = Recipe.query if recipe_ids is None else Recipe.query.filter(Recipe.id.in_(recipe_ids))
+        return query.update({
+            Recipe.rating_sum: stars_sum,
+            Recipe.rating_votes: votes,
+            Recipe.rating_avg: avg,
+            # Neue Version, sonst liefern ETags und Karten-/Fragment-Cache alte Durchschnitte
+            Recipe.version: Recipe.version + 1,
+            Recipe.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
 
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -55,6 +104,8 @@ class Comment(db.Model):
     text = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index("ix_comment_recipe_created_at", "recipe_id", "created_at", "id"),)
+
 class Rating(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"))
@@ -70,4 +121,58 @@ class Favorite(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('recipe_id', 'user_id', name='_favorite_recipe_user_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('recipe_id', 'user_id', name='_favorite_recipe_user_uc'),
+        # Favoritenlisten pro User nach Zeitpunkt: (created_at, id) für das Keyset im Profil-Tab,
+        # recipe_id macht ihn für Join und ID-Listen abdeckend
+        db.Index("ix_favorite_user_created_at_id_recipe", "user_id", "created_at", "id", "recipe_id"),
+    )
+
+class Facet(db.Model):
+    # Anzahl Rezepte pro Filterwert (Kategorie, Schwierigkeit, Dauer-Bucket), gepflegt von app/facets.py
+    kind = db.Column(db.String(16), primary_key=True)
+    value = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class TrendingScore(db.Model):
+    # Gesicherter Stand der Trending-Bestenliste (app/trending.py): Score zum Zeitpunkt saved_at
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    saved_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Ingredient(db.Model):
+    # Normalisierte Zutaten-Begriffe (Vokabular des invertierten Index)
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+
+class RecipeIngredient(db.Model):
+    # Posting-Listen: welcher Begriff kommt in welcher Zutatenzeile eines Rezepts vor
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey("ingredient.id"), primary_key=True)
+    line = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    __table_args__ = (db.Index("ix_recipe_ingredient_ingredient", "ingredient_id", "recipe_id", "line"),)
+
+class SimilarRecipe(db.Model):
+    # Vorberechnete Item-Item-Nachbarn (flask build-similar), Abfrage über den Primärschlüssel
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    similar_id = db.Column(db.Integer, db.ForeignKey("recipe.id"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    similar = db.relationship("Recipe", foreign_keys=[similar_id])
+
+    __table_args__ = (db.Index("ix_similar_recipe_similar_id", "similar_id"),)
+
+    @staticmethod
+    def for_recipe_query(recipe_id):
+        return (
+            SimilarRecipe.query.filter_by(recipe_id=recipe_id)
+            .options(db.joinedload(SimilarRecipe.similar))
+            .order_by(SimilarRecipe.rank)
+        )
+
+    @staticmethod
+    def for_recipe(recipe_id):
+        return SimilarRecipe.for_recipe_query(recipe_id).all()
@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, item_id):
+    raw = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def keyset_query(query, created_col, id_col, cursor=None, per_page=20):
+    # Eine Zeile mehr als per_page: zeigt an, ob es eine nächste Seite gibt
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, last_id))
+    return query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1)
+
+
+def keyset_page(query, created_col, id_col, cursor=None, per_page=20):
+    """Seite absteigend nach (created_at, id), unabhängig von der Seitentiefe gleich teuer.
+
+    Liefert (items, next_cursor); next_cursor ist None auf der letzten Seite.
+    """
+    items = keyset_query(query, created_col, id_col, cursor, per_page).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return items, next_cursor
@@ -0,0 +1,126 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from flask import jsonify, make_response, render_template, request
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# PBKDF2 ist reine CPU-Last; in einem Prozess-Pool blockiert es weder die GIL
+# noch die Worker, die gerade Rezepte ausliefern.
+_iterations = DEFAULT_PBKDF2_ITERATIONS
+_workers = 0
+_slots = threading.BoundedSemaphore(16)
+_wait = 0.5
+_timeout = 10.0
+_retry_after = 2
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Alle Hash-Slots belegt; wird als 503 mit Retry-After beantwortet."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Password hashing is saturated")
+        self.retry_after = retry_after
+
+
+def init_app(app):
+    global _iterations, _workers, _slots, _wait, _timeout, _retry_after
+    _iterations = app.config.get("PASSWORD_HASH_ITERATIONS", DEFAULT_PBKDF2_ITERATIONS)
+    _workers = app.config.get("PASSWORD_HASH_WORKERS", 2)
+    # Laufende plus wartende Hash-Aufträge; alles darüber wird sofort abgewiesen
+    _slots = threading.BoundedSemaphore(max(_workers, 1) + max(app.config.get("PASSWORD_HASH_QUEUE", 16), 0))
+    _wait = app.config.get("PASSWORD_HASH_WAIT", 0.5)
+    _timeout = app.config.get("PASSWORD_HASH_TIMEOUT", 10.0)
+    _retry_after = app.config.get("PASSWORD_HASH_RETRY_AFTER", 2)
+    app.register_error_handler(HashingBusy, _busy_response)
+
+
+def _busy_response(error):
+    if request.blueprint == "api":
+        response = jsonify({"message": "Server busy, please retry"})
+    else:
+        response = render_template("errors/503.html")
+    response = make_response(response)
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def _pool():
+    # Erst bei Bedarf und pro Prozess anlegen (Pool aus dem Master überlebt kein Fork)
+    global _executor, _executor_pid
+    if _workers <= 0:
+        return None
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=_workers)
+            _executor_pid = os.getpid()
+            atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+        return _executor
+
+
+def _reset_pool(broken):
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=_wait):
+        raise HashingBusy(_retry_after)
+    try:
+        pool = _pool()
+        if pool is None:
+            return fn(*args)
+        try:
+            return pool.submit(fn, *args).result(timeout=_timeout)
+        except FutureTimeout:
+            raise HashingBusy(_retry_after)
+        except BrokenProcessPool:
+            # Abgestürzter Worker: Pool beim nächsten Aufruf neu starten
+            _reset_pool(pool)
+            raise HashingBusy(_retry_after)
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, f"pbkdf2:sha256:{_iterations}")
+
+
+def verify_password(password_hash, password):
+    if not password_hash or password is None:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    # Gespeichertes Verfahren inkl. Iterationen, z.B. "pbkdf2:sha256:600000"
+    if not password_hash:
+        return False
+    method = password_hash.split("$", 1)[0].split(":")
+    if method[:2] != ["pbkdf2", "sha256"] or len(method) != 3 or not method[2].isdigit():
+        return True
+    # Nur hochstufen: stärkere Hashes (z.B. vor Senken der Konfiguration) bleiben
+    return int(method[2]) < _iterations
+
+
+def upgrade(user, password):
+    """Hasht ein gerade geprüftes Passwort mit den aktuellen Parametern neu.
+
+    Läuft nach erfolgreichem Login; ist der Pool ausgelastet, wird es beim
+    nächsten Login erneut versucht. Der Aufrufer committet.
+    """
+    if not needs_rehash(user.password_hash):
+        return False
+    try:
+        user.password_hash = hash_password(password)
+    except HashingBusy:
+        return False
+    return True
@@ -0,0 +1,91 @@
+from . import db, search, facets, fieldsets
+from .models import User, Recipe, Comment, Rating, Favorite
+
+# Query-Builder der Hot-Paths: die Views führen sie aus, `flask check-query-plans`
+# prüft genau dieselben Ausdrücke (app/queryplans.py).
+
+
+def count_statement(query):
+    # COUNT(*) über die Query ohne Sortierung, wie Query.count() und paginate()
+    return db.select(db.func.count()).select_from(query.order_by(None).subquery())
+
+
+def total(query):
+    return db.session.scalar(count_statement(query))
+
+
+def recipe_overview(selection, q="", sort_by="date"):
+    """Rezeptübersicht: Facetten, Volltextsuche und Sortierung (recipes.index)."""
+    query = facets.apply_filters(Recipe.query, selection)
+    # Ohne verwertbare Suchbegriffe ("*", Satzzeichen) keine Suche und kein Join auf recipe_fts
+    if not search.match_expression(q):
+        q = ""
+    if q:
+        query = search.search(query, q)
+    if q and sort_by == "relevance":
+        return query.order_by(search.relevance())
+    if sort_by == "rating":
+        # Gespeicherte Durchschnittsbewertung (Index ix_recipe_rating_avg)
+        return query.order_by(Recipe.rating_avg.desc(), Recipe.created_at.desc())
+    return query.order_by(Recipe.created_at.desc())
+
+
+def recipe_list(selection, fields, includes=()):
+    # Basis für /api/recipes: nur die angeforderten Spalten, gleiche Facetten wie die Übersicht
+    return facets.apply_filters(Recipe.query.options(fieldsets.load_options(fields, includes)), selection)
+
+
+def recipes_by_ids(ids, fields, includes=()):
+    return Recipe.query.options(fieldsets.load_options(fields, includes)).filter(Recipe.id.in_(ids))
+
+
+def search_results(q, fields, includes=()):
+    query = Recipe.query.options(fieldsets.load_options(fields, includes))
+    return search.search(query, q).order_by(search.relevance())
+
+
+def recipe_version(recipe_id):
+    # Validator für ETag/Last-Modified, ohne die Text-Spalten zu laden
+    return db.session.query(Recipe.version, Recipe.updated_at).filter_by(id=recipe_id)
+
+
+def recipe_comments(recipe_id):
+    return Comment.query.filter_by(recipe_id=recipe_id)
+
+
+def user_rating(recipe_id, user_id):
+    return Rating.query.filter_by(recipe_id=recipe_id, user_id=user_id)
+
+
+def user_favorite(recipe_id, user_id):
+    return Favorite.query.filter_by(recipe_id=recipe_id, user_id=user_id)
+
+
+def favorite_ids(user_id):
+    return db.session.query(Favorite.recipe_id).filter_by(user_id=user_id)
+
+
+def favorite_recipes(user_id, by_favorited=False):
+    # Sortiert nach Rezeptdatum (recipes.favorites) oder Favorisierungszeitpunkt (/api/favorites)
+    order = Favorite.created_at.desc() if by_favorited else Recipe.created_at.desc()
+    return (
+        Recipe.query.join(Favorite, Favorite.recipe_id == Recipe.id)
+        .filter(Favorite.user_id == user_id)
+        .order_by(order)
+    )
+
+
+def user_recipes(user_id):
+    return Recipe.query.filter_by(created_by=user_id)
+
+
+def user_favorites(user_id):
+    return Favorite.query.filter_by(user_id=user_id).options(db.joinedload(Favorite.recipe))
+
+
+def user_by_username(username):
+    return User.query.filter_by(username=username)
+
+
+def user_by_email(email):
+    return User.query.filter_by(email=email)
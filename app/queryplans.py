@@ -0,0 +1,134 @@
+import re
+from datetime import datetime
+from . import db, search, fieldsets, facets, writebehind, queries, activity, cards, ingredients, images
+from .models import Recipe, Comment, Rating, Favorite, SimilarRecipe
+from .pagination import encode_cursor, keyset_query
+
+# "SCAN recipe" bzw. "SCAN recipe AS r" ohne "USING ... INDEX" = Full Table Scan
+# (Subqueries/Co-Routinen zählen nicht)
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+# Aliase von SQLAlchemy (recipe_1) auf die Tabelle zurückführen
+_ALIAS_SUFFIX = re.compile(r"_\d+$")
+# Auch Teilsortierungen: "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY" / "LAST TERM OF ORDER BY"
+_TEMP_SORT = re.compile(r"^USE TEMP B-TREE FOR (?:.+ OF )?ORDER BY$")
+
+
+def _paginated(name, query, per_page, sort_allowed, page=2):
+    # paginate(): Seite per LIMIT/OFFSET plus COUNT(*) über dieselbe Query
+    yield name, query.limit(per_page).offset((page - 1) * per_page), sort_allowed
+    yield f"{name} COUNT", queries.count_statement(query), False
+
+
+def hot_queries(user_id=1, recipe_id=1):
+    """Die Queries der Request-Pfade, aus denselben Buildern wie in den Views.
+
+    Liefert (Name, Query, sortieren_erlaubt). Sortieren ist nur erlaubt, wenn die
+    Treffermenge vorher über einen Index auf wenige Zeilen eingeschränkt wird.
+    """
+    from .recipes import RECIPES_PER_PAGE
+    from .auth import PROFILE_PER_PAGE
+
+    cursor = encode_cursor(datetime.utcnow(), 10 ** 9)
+    recipe_ids = [recipe_id, recipe_id + 1]
+    list_fields = fieldsets.LIST_FIELDS
+
+    overviews = [
+        ("Datum", {}, "", "date", False),
+        ("Kategorie", {"category": ["Dessert"]}, "", "date", False),
+        ("Bewertung", {}, "", "rating", False),
+        ("Bewertung Kategorie", {"category": ["Dessert"]}, "", "rating", False),
+        ("Mehrfach-Kategorie", {"category": ["Dessert", "Suppe"], "duration": ["0-15"]}, "", "date", True),
+    ]
+    if search.fts_enabled():
+        overviews.append(("Suche", {}, "pasta", "relevance", True))
+    for label, selection, q, sort_by, sort_allowed in overviews:
+        yield from _paginated(
+            f"recipes.index {label}", queries.recipe_overview(selection, q, sort_by), RECIPES_PER_PAGE, sort_allowed
+        )
+    yield "recipes.index Facetten", facets.counts_query(), False
+    yield "recipes.index Favoriten-IDs", queries.favorite_ids(user_id), False
+
+    yield "recipes.view Rezept", Recipe.query.filter_by(id=recipe_id), False
+    yield "recipes.view Kommentare", queries.recipe_comments(recipe_id).order_by(Comment.created_at.desc()), False
+    yield "recipes.view Bewertung", queries.user_rating(recipe_id, user_id), False
+    yield "recipes.view Favorit", queries.user_favorite(recipe_id, user_id), False
+    yield "recipes.view Ähnliche", SimilarRecipe.for_recipe_query(recipe_id), False
+    yield from _paginated("recipes.favorites", queries.favorite_recipes(user_id), RECIPES_PER_PAGE, True)
+
+    yield "auth.login", queries.user_by_username("user1"), False
+    yield "auth.register E-Mail", queries.user_by_email("user1@example.com"), False
+    yield "auth.profile Zähler", activity.counts_query(user_id), False
+    yield "auth.profile Rezepte Cursor", keyset_query(
+        queries.user_recipes(user_id), Recipe.created_at, Recipe.id, cursor, PROFILE_PER_PAGE
+    ), False
+    yield "auth.profile Favoriten Cursor", keyset_query(
+        queries.user_favorites(user_id), Favorite.created_at, Favorite.id, cursor, PROFILE_PER_PAGE
+    ), False
+
+    yield "cards Autoren", cards.authors_query([user_id, user_id + 1]), False
+    for column in (Favorite.recipe_id, Comment.recipe_id):
+        yield f"cards Anzahl {column.class_.__name__}", cards.counts_query(column, recipe_ids), False
+
+    recipe_list = queries.recipe_list({}, list_fields)
+    yield "api.list_recipes Cursor", keyset_query(recipe_list, Recipe.created_at, Recipe.id, cursor), False
+    yield "api.list_recipes total", queries.count_statement(recipe_list), False
+    yield from _paginated(
+        "api.list_recipes page", recipe_list.order_by(Recipe.created_at.desc(), Recipe.id.desc()), 20, False
+    )
+    yield "api.list_recipes ids", queries.recipes_by_ids(recipe_ids, list_fields), False
+    yield "api.get_recipe Version", queries.recipe_version(recipe_id), False
+    yield "api.get_comments Cursor", keyset_query(
+        queries.recipe_comments(recipe_id), Comment.created_at, Comment.id, cursor
+    ), False
+    yield "api.get_comments total", queries.count_statement(queries.recipe_comments(recipe_id)), False
+    if search.fts_enabled():
+        yield from _paginated("api.search_recipes", queries.search_results("pasta", list_fields), 20, True)
+    for require_all in (False, True):
+        # Sortierung nach Abdeckung ist berechnet, die Kandidaten kommen aus den Posting-Listen
+        yield f"api.recipes_by_ingredients{' alle' if require_all else ''}", (
+            ingredients.pantry_query([1, 2, 3], require_all=require_all)
+        ), True
+    yield "api.list_favorites", queries.favorite_recipes(user_id, by_favorited=True), False
+    yield "api include=comments", fieldsets.latest_comments_query(recipe_ids), True
+
+    pairs = [(recipe_id, user_id), (recipe_id + 1, user_id)]
+    yield "writebehind Bewertungen", Rating.query.filter(*writebehind._pairs_filter(Rating, pairs)), False
+    yield "writebehind Favoriten", Favorite.query.filter(*writebehind._pairs_filter(Favorite, pairs)), False
+
+    for model in (Comment, Rating):
+        yield f"activity.recipe_deleted {model.__name__}", activity.owner_counts_query(model, recipe_id), True
+
+    yield "images.discard", images.other_users_query("/static/uploads/x.jpg", recipe_id), False
+
+
+def explain(query):
+    # ORM-Query oder fertiges Statement (COUNT aus queries.count_statement)
+    statement = getattr(query, "statement", query).compile(db.engine, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return [row[-1] for row in rows]
+
+
+def _is_full_scan(line):
+    match = _FULL_SCAN.match(line)
+    if match is None:
+        return False
+    name = match.group(1)
+    if name not in db.metadata.tables:
+        name = _ALIAS_SUFFIX.sub("", name)
+    return name in db.metadata.tables
+
+
+def problems(plan, sort_allowed=False):
+    found = [line for line in plan if _is_full_scan(line)]
+    if not sort_allowed:
+        found += [line for line in plan if _TEMP_SORT.match(line)]
+    return found
+
+
+def check_all(**kwargs):
+    """Liste von (Name, Plan, Probleme) für alle Hot-Queries."""
+    return [
+        (name, plan, problems(plan, sort_allowed))
+        for name, query, sort_allowed in hot_queries(**kwargs)
+        for plan in [explain(query)]
+    ]
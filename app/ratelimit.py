@@ -0,0 +1,273 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from flask import g, jsonify, make_response, render_template, request, session
+from . import identity
+
+log = logging.getLogger(__name__)
+
+# "20/second", "300/minute burst 600", "5/m"; leer oder None = unbegrenzt
+_RULE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*/\s*(s|sec|second|m|min|minute|h|hour)\s*(?:burst\s+(\d+))?\s*$")
+_PERIODS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60, "h": 3600, "hour": 3600}
+
+_backend = None
+_rules = {}
+_resolved = {}
+_shedder = None
+_shed_exempt = frozenset()
+_limited = 0
+
+
+class Rule:
+    """Token-Bucket: `capacity` Anfragen am Stück, danach `rate` pro Sekunde."""
+
+    def __init__(self, scope, rate, capacity):
+        self.scope = scope
+        self.rate = rate
+        self.capacity = capacity
+
+
+def parse_rule(scope, text):
+    if not text:
+        return None
+    match = _RULE.match(text)
+    if match is None or not float(match.group(1)):
+        raise ValueError(f"Ungültiges Rate-Limit für {scope}: {text!r}")
+    count, period, burst = match.groups()
+    count = float(count)
+    return Rule(scope, count / _PERIODS[period], int(burst) if burst else max(int(count), 1))
+
+
+class MemoryBackend:
+    """Buckets im Prozess; jeder Worker zählt für sich. Älteste Schlüssel fallen per LRU weg."""
+
+    def __init__(self, url=None, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity):
+        """0, wenn erlaubt, sonst Sekunden bis zum nächsten Token."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens >= 1:
+                wait, tokens = 0.0, tokens - 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._buckets)}
+
+
+# Atomar in Redis: Bucket lesen, auffüllen, Token abziehen; Zeit vom Redis-Server
+_REDIS_TAKE = """
+local rate, capacity = tonumber(ARGV[1]), tonumber(ARGV[2])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 't', 's')
+local tokens = tonumber(bucket[1]) or capacity
+local stamp = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - stamp, 0) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 's', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Gemeinsame Buckets für alle Worker und Hosts (benötigt das Paket redis).
+
+    Ist Redis nicht erreichbar, werden Anfragen durchgelassen statt abgewiesen.
+    """
+
+    def __init__(self, url, prefix="ratelimit:"):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._take = self._client.register_script(_REDIS_TAKE)
+        self.errors = 0
+
+    def take(self, key, rate, capacity):
+        try:
+            return float(self._take(keys=[self.prefix + key], args=[rate, capacity]))
+        except Exception as e:
+            self.errors += 1
+            log.warning("Rate-Limit-Backend nicht erreichbar, Anfrage wird durchgelassen: %s", e)
+            return 0.0
+
+    def stats(self):
+        return {"backend": "redis", "errors": self.errors}
+
+
+# URL-Schema -> Backend-Klasse; weitere Backends können sich hier eintragen
+BACKENDS = {"memory": MemoryBackend, "redis": RedisBackend, "rediss": RedisBackend}
+
+
+def create_backend(url):
+    scheme = url.partition("://")[0]
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unbekanntes Rate-Limit-Backend: {url}")
+    return BACKENDS[scheme](url)
+
+
+class ConcurrencyLimiter:
+    """Adaptive Obergrenze für gleichzeitig laufende Requests (AIMD).
+
+    Liegt die Dauer eines Requests über `target`, während mindestens `min_limit`
+    Requests laufen, sinkt die Grenze auf 90 % der tatsächlichen Parallelität
+    (höchstens einmal pro `target`); schnelle Requests heben sie langsam wieder bis
+    `max_limit`. Abgewiesen (503) wird nur, solange die Grenze unter `max_limit`
+    liegt, also wenn Requests sich wirklich stauen. Ohne Stau gibt es keine feste
+    Obergrenze, viele schnelle Requests (ASGI) laufen ungebremst.
+    """
+
+    def __init__(self, max_limit=64, min_limit=4, target=0.25):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.target = target
+        self.limit = float(max_limit)
+        self.inflight = 0
+        self.shed = 0
+        self._decreased = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.limit < self.max_limit and self.inflight >= int(self.limit):
+                self.shed += 1
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self, duration=None):
+        with self._lock:
+            self.inflight -= 1
+            if duration is None:
+                return
+            now = time.monotonic()
+            if duration > self.target:
+                # Gemessen an der tatsächlichen Parallelität: unter WSGI nie mehr als die Threads
+                concurrency = self.inflight + 1
+                if concurrency >= self.min_limit and now - self._decreased > self.target:
+                    self.limit = max(self.min_limit, min(self.limit, concurrency) * 0.9)
+                    self._decreased = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self):
+        with self._lock:
+            return {"inflight": self.inflight, "limit": int(self.limit), "shed": self.shed}
+
+
+def init_app(app):
+    global _backend, _rules, _resolved, _shedder, _shed_exempt, _limited
+    _rules = {
+        scope: parse_rule(scope, text)
+        for scope, text in app.config.get("RATE_LIMITS", {}).items()
+    }
+    _resolved = {}
+    _limited = 0
+    _backend = create_backend(app.config.get("RATE_LIMIT_STORAGE", "memory://")) if any(_rules.values()) else None
+
+    max_concurrency = app.config.get("SHED_MAX_CONCURRENCY", 0)
+    _shedder = ConcurrencyLimiter(
+        max_limit=max_concurrency,
+        min_limit=app.config.get("SHED_MIN_CONCURRENCY", 4),
+        target=app.config.get("SHED_TARGET_MS", 250) / 1000.0,
+    ) if max_concurrency > 0 else None
+    _shed_exempt = frozenset(app.config.get("SHED_EXEMPT", ()))
+    retry_after = app.config.get("SHED_RETRY_AFTER", 1)
+
+    @app.before_request
+    def limit_request():
+        response = _rate_limit()
+        if response is None and _shedder is not None and request.endpoint not in _shed_exempt:
+            if not _shedder.acquire():
+                return _reject(503, retry_after, "Server busy, please retry")
+            g._shed_start = time.perf_counter()
+        return response
+
+    app.after_request(_release)
+    app.teardown_request(_release_on_error)
+
+
+def _rule():
+    # Spezifischste Regel: "METHODE endpoint", endpoint, Blueprint
+    key = (request.method, request.endpoint)
+    if key not in _resolved:
+        candidates = [f"{request.method} {request.endpoint}", request.endpoint, request.blueprint]
+        _resolved[key] = next((_rules[c] for c in candidates if c in _rules), None)
+    return _resolved[key]
+
+
+def _client():
+    # Pro User (Token bzw. Login-Session), sonst pro IP
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        try:
+            return f"user:{identity.decode_token(auth[7:].strip())['user_id']}"
+        except Exception:
+            pass
+    # Session nur außerhalb der API lesen, sonst bekäme jede Antwort "Vary: Cookie"
+    user_id = session.get("_user_id") if request.blueprint != "api" else None
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def _rate_limit():
+    global _limited
+    if request.endpoint is None:
+        return None
+    rule = _rule()
+    if rule is None:
+        return None
+    wait = _backend.take(f"{rule.scope}:{_client()}", rule.rate, rule.capacity)
+    if wait <= 0:
+        return None
+    _limited += 1
+    return _reject(429, math.ceil(wait), "Too many requests")
+
+
+def _reject(status, retry_after, message):
+    if request.blueprint == "api":
+        response = jsonify({"message": message})
+    else:
+        response = render_template(f"errors/{status}.html")
+    response = make_response(response, status)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _release(response):
+    # Schon nach dem View freigeben: Event-Streams sollen keinen Slot belegen
+    start = g.pop("_shed_start", None)
+    if start is not None:
+        _shedder.release(time.perf_counter() - start)
+    return response
+
+
+def _release_on_error(exc):
+    if g.pop("_shed_start", None) is not None:
+        _shedder.release()
+
+
+def stats():
+    return {
+        "limited": _limited,
+        "backend": _backend.stats() if _backend is not None else None,
+        "shedding": _shedder.stats() if _shedder is not None else None,
+    }
@@ -1,49 +1,49 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from . import db
-import os
-import time
-from .models import Recipe, Comment, Rating, Favorite
-from werkzeug.utils import secure_filename
+from .models import Recipe, Comment, Rating, SimilarRecipe
+from . import search, images, indexing, facets, writebehind, fragments, trending, events, activity, queries
 from flask_login import login_required, current_user
 
 bp = Blueprint("recipes", __name__)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+RECIPES_PER_PAGE = 24
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower()
+
 @bp.route("/")
 @login_required
 def index():
     # Filter
-    category = request.args.get("category")
-    sort_by = request.args.get("sort", "date")
-
-    query = Recipe.query
-
-    if category:
-        query = query.filter_by(category=category)
-
-    # Sortierung
-    if sort_by == "rating":
-        # Sortiere nach durchschnittlicher Bewertung (komplexer)
-        recipes = query.all()
-        recipes.sort(key=lambda r: r.average_rating(), reverse=True)
-    else:
-        recipes = query.order_by(Recipe.created_at.desc()).all()
-
-    # Alle Kategorien für Filter
-    categories = db.session.query(Recipe.category).distinct().filter(Recipe.category != None).all()
-    categories = [c[0] for c in categories]
+    q = request.args.get("q", "").strip()
+    if q and not search.match_expression(q):
+        # Wie /api/search: nur Satzzeichen o.ä., keine Wörter zum Suchen
+        flash("Bitte gib einen Suchbegriff ein", "warning")
+        q = ""
+    selection = facets.selected(request.args)
+    sort_by = request.args.get("sort", "relevance" if q else "date")
+    page = request.args.get("page", 1, type=int)
+
+    # Facetten (mehrere Werte je Facette kombinierbar), Volltextsuche und Sortierung
+    query = queries.recipe_overview(selection, q, sort_by)
+    pagination = query.paginate(page=page, per_page=RECIPES_PER_PAGE, error_out=False)
+
+    # Filterwerte mit Anzahl aus der Facetten-Tabelle statt DISTINCT über alle Rezepte
+    facet_counts = facets.load()
 
     # Favoriten-IDs des aktuellen Users
-    favorite_ids = set(f.recipe_id for f in Favorite.query.filter_by(user_id=current_user.id).all())
+    favorite_ids = {recipe_id for recipe_id, in queries.favorite_ids(current_user.id)}
 
     return render_template(
         "recipes/index.html",
-        recipes=recipes,
-        categories=categories,
-        current_category=category,
+        cards=fragments.recipe_cards(pagination.items, "fragments/recipe_card.html"),
+        pagination=pagination,
+        facets=facet_counts,
+        current_query=q,
+        selection=selection,
         current_sort=sort_by,
         favorite_ids=favorite_ids
     )
@@ -70,13 +70,8 @@ def create():
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Eindeutiger Dateiname
-                filename = f"{current_user.id}_{int(time.time())}_{filename}"
-                filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                file.save(filepath)
-                image_url = f"/static/uploads/{filename}"
+                # Inhaltsadressiert speichern, Varianten entstehen im Hintergrund
+                image_url = images.save_upload(file, file_extension(file.filename))
 
         r = Recipe(
             title=title, description=description, ingredients=ingredients,
@@ -86,6 +81,7 @@ def create():
             image_url=image_url
         )
         db.session.add(r)
+        indexing.recipe_saved(r)
         db.session.commit()
         return redirect(url_for("recipes.view", recipe_id=r.id))
 
@@ -95,14 +91,26 @@ def create():
 @login_required
 def view(recipe_id):
     r = Recipe.query.get_or_404(recipe_id)
-    comments = Comment.query.filter_by(recipe_id=recipe_id).order_by(Comment.created_at.desc()).all()
+    comments = queries.recipe_comments(recipe_id).order_by(Comment.created_at.desc()).all()
 
     # Prüfe ob User bereits bewertet hat
-    user_rating = Rating.query.filter_by(recipe_id=recipe_id, user_id=current_user.id).first()
+    user_rating = queries.user_rating(recipe_id, current_user.id).first()
     # Prüfe ob favorisiert
-    user_favorited = Favorite.query.filter_by(recipe_id=recipe_id, user_id=current_user.id).first() is not None
+    user_favorited = queries.user_favorite(recipe_id, current_user.id).first() is not None
+    # Noch nicht geschriebene Änderungen aus der Write-Behind-Queue anzeigen
+    pending_stars = writebehind.pending_rating(recipe_id, current_user.id)
+    if pending_stars is not None:
+        user_rating = Rating(recipe_id=recipe_id, user_id=current_user.id, stars=pending_stars)
+    pending_favorite = writebehind.pending_favorite(recipe_id, current_user.id)
+    if pending_favorite is not None:
+        user_favorited = pending_favorite
 
-    return render_template("recipes/view.html", recipe=r, comments=comments, user_rating=user_rating, user_favorited=user_favorited)
+    # Vorberechnete ähnliche Rezepte
+    similar = SimilarRecipe.for_recipe(recipe_id)
+
+    # Bild, Zutaten, Anleitung und Zähler einmal pro Rezeptversion rendern
+    detail_html = fragments.render("fragments/recipe_detail.html", (r.id, r.version), recipe=r)
+    return render_template("recipes/view.html", recipe=r, detail_html=detail_html, comments=comments, user_rating=user_rating, user_favorited=user_favorited, similar=similar)
 
 
 @bp.route("/<int:recipe_id>/comment", methods=["POST"])
@@ -115,6 +123,10 @@ def comment(recipe_id):
     c = Comment(recipe_id=recipe_id, user_id=current_user.id, text=text)
     db.session.add(c)
     db.session.commit()
+    # Versionssprung (ETags, Karten-Cache) darf nachlaufen
+    writebehind.touch(recipe_id)
+    trending.record(recipe_id, "comment")
+    events.comment_added(c, current_user.username)
     flash("Kommentar hinzugefügt", "success")
     return redirect(url_for("recipes.view", recipe_id=recipe_id))
 
@@ -128,20 +140,15 @@ def rate(recipe_id):
         flash("Bitte wähle 1-5 Sterne", "warning")
         return redirect(url_for("recipes.view", recipe_id=recipe_id))
 
-    # Prüfe ob User bereits bewertet hat
-    existing_rating = Rating.query.filter_by(recipe_id=recipe_id, user_id=current_user.id).first()
-
-    if existing_rating:
-        # Update existing rating
-        existing_rating.stars = stars
-        flash("Bewertung aktualisiert", "success")
-    else:
-        # Create new rating
-        rating = Rating(recipe_id=recipe_id, user_id=current_user.id, stars=stars)
-        db.session.add(rating)
-        flash("Bewertung hinzugefügt", "success")
-
-    db.session.commit()
+    Recipe.query.get_or_404(recipe_id)
+    # Prüfe ob User bereits bewertet hat (auch noch nicht geschrieben)
+    existing_rating = (
+        writebehind.pending_rating(recipe_id, current_user.id) is not None
+        or db.session.query(queries.user_rating(recipe_id, current_user.id).exists()).scalar()
+    )
+    # Neu oder geändert: Upsert samt Aggregaten über die Write-Behind-Queue (zählt auch für Trending)
+    writebehind.rate(recipe_id, current_user.id, stars)
+    flash("Bewertung aktualisiert" if existing_rating else "Bewertung hinzugefügt", "success")
     return redirect(url_for("recipes.view", recipe_id=recipe_id))
 
 
@@ -166,27 +173,26 @@ def edit(recipe_id):
         r.difficulty = request.form.get("difficulty")
 
         # Bild-Upload
+        old_image = None
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename and allowed_file(file.filename):
-                # Lösche altes Bild falls vorhanden
-                if r.image_url:
-                    old_image = r.image_url.replace('/static/', 'app/static/')
-                    if os.path.exists(old_image):
-                        os.remove(old_image)
-
-                filename = secure_filename(file.filename)
-                filename = f"{current_user.id}_{int(time.time())}_{filename}"
-                filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                file.save(filepath)
-                r.image_url = f"/static/uploads/{filename}"
+                image_url = images.save_upload(file, file_extension(file.filename))
+                if r.image_url != image_url:
+                    old_image = r.image_url
+                r.image_url = image_url
 
         if not r.title:
             flash("Titel erforderlich", "danger")
             return redirect(url_for("recipes.edit", recipe_id=recipe_id))
 
+        indexing.recipe_saved(r)
+        Recipe.touch(recipe_id)
         db.session.commit()
+
+        # Altes Bild nach dem Commit löschen (nur wenn kein anderes Rezept es nutzt)
+        if old_image:
+            writebehind.discard_image(old_image, r.id)
         flash("Rezept erfolgreich aktualisiert", "success")
         return redirect(url_for("recipes.view", recipe_id=recipe_id))
 
@@ -204,9 +210,12 @@ def delete(recipe_id):
         return redirect(url_for("recipes.view", recipe_id=recipe_id))
 
     # Lösche zuerst alle Kommentare und Ratings
+    activity.recipe_deleted(recipe_id)
     Comment.query.filter_by(recipe_id=recipe_id).delete()
     Rating.query.filter_by(recipe_id=recipe_id).delete()
 
+    indexing.recipe_deleted(recipe_id)
+    trending.remove(recipe_id)
     db.session.delete(r)
     db.session.commit()
     flash("Rezept erfolgreich gelöscht", "success")
@@ -217,14 +226,15 @@ def delete(recipe_id):
 @login_required
 def favorites():
     # Rezepte, die der aktuelle User favorisiert hat
-    fav_recipes = (
-        Recipe.query
-        .join(Favorite, Favorite.recipe_id == Recipe.id)
-        .filter(Favorite.user_id == current_user.id)
-        .order_by(Recipe.created_at.desc())
-        .all()
+    page = request.args.get("page", 1, type=int)
+    pagination = queries.favorite_recipes(current_user.id).paginate(
+        page=page, per_page=RECIPES_PER_PAGE, error_out=False
+    )
+    return render_template(
+        "recipes/favorites.html",
+        cards=fragments.recipe_cards(pagination.items, "fragments/favorite_card.html"),
+        pagination=pagination
     )
-    return render_template("recipes/favorites.html", recipes=fav_recipes)
 
 
 @bp.route("/<int:recipe_id>/favorite", methods=["POST"])
@@ -232,24 +242,19 @@ def favorites():
 def favorite(recipe_id):
     # Existiert Rezept?
     Recipe.query.get_or_404(recipe_id)
-    existing = Favorite.query.filter_by(recipe_id=recipe_id, user_id=current_user.id).first()
-    if not existing:
-        fav = Favorite(recipe_id=recipe_id, user_id=current_user.id)
-        db.session.add(fav)
-        db.session.commit()
-        flash("Zu Favoriten hinzugefügt", "success")
-    else:
+    if writebehind.is_favorite(recipe_id, current_user.id):
         flash("Bereits in Favoriten", "info")
+    else:
+        writebehind.favorite(recipe_id, current_user.id)
+        flash("Zu Favoriten hinzugefügt", "success")
     return redirect(request.referrer or url_for("recipes.view", recipe_id=recipe_id))
 
 
 @bp.route("/<int:recipe_id>/unfavorite", methods=["POST"])
 @login_required
 def unfavorite(recipe_id):
-    existing = Favorite.query.filter_by(recipe_id=recipe_id, user_id=current_user.id).first()
-    if existing:
-        db.session.delete(existing)
-        db.session.commit()
+    if writebehind.is_favorite(recipe_id, current_user.id):
+        writebehind.favorite(recipe_id, current_user.id, add=False)
         flash("Aus Favoriten entfernt", "success")
     else:
         flash("Nicht in Favoriten", "info")
@@ -0,0 +1,124 @@
+import re
+from sqlalchemy import table, column, text, or_, false
+from . import db
+from .models import Recipe
+
+# Leichtgewichtige Tabellen-Referenz (nicht Teil der Metadaten, create_all ignoriert sie)
+recipe_fts = table("recipe_fts", column("rowid"), column("recipe_fts"), column("rank"))
+
+MAX_TERMS = 8
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_ready = set()
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts USING fts5("
+    "title, description, ingredients, steps, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+# Titel wiegt am meisten, dann Zutaten
+RANK_SQL = "INSERT INTO recipe_fts(recipe_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 4.0, 1.0)')"
+
+
+def fts_supported():
+    return db.engine.dialect.name == "sqlite"
+
+
+def fts_enabled():
+    # Nur lesen: die Tabelle legt die Migration bzw. `flask search-rebuild` an
+    if not fts_supported():
+        return False
+    url = str(db.engine.url)
+    if url in _ready:
+        return True
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_fts'")
+    ).first()
+    if exists:
+        _ready.add(url)
+    return exists is not None
+
+
+def create_index():
+    # Tabelle und Spaltengewichte anlegen; Commit beim Aufrufer
+    db.session.execute(text(CREATE_SQL))
+    db.session.execute(text(RANK_SQL))
+
+
+def match_expression(q):
+    # Benutzereingabe in sichere Präfix-Terme zerlegen, keine FTS-Syntax durchreichen
+    terms = _TERM_RE.findall((q or "").lower())[:MAX_TERMS]
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search(query, q):
+    """Schränkt eine Recipe-Query auf Treffer für q ein (Sortierung über relevance())."""
+    match = match_expression(q)
+    if not match:
+        return query.filter(false())
+
+    if not fts_enabled():
+        like = "%" + re.sub(r"([\\%_])", r"\\\1", q) + "%"
+        return query.filter(or_(
+            Recipe.title.ilike(like, escape="\\"),
+            Recipe.description.ilike(like, escape="\\"),
+        ))
+
+    return (
+        query.join(recipe_fts, recipe_fts.c.rowid == Recipe.id)
+        .filter(recipe_fts.c.recipe_fts.op("MATCH")(match))
+    )
+
+
+def relevance():
+    # Sortierausdruck für Queries aus search(); ohne FTS nach Datum
+    if not fts_enabled():
+        return Recipe.created_at.desc()
+    return recipe_fts.c.rank
+
+
+def index_recipe(recipe):
+    if not fts_enabled():
+        return
+    if recipe.id is None:
+        db.session.flush()
+    db.session.execute(text("DELETE FROM recipe_fts WHERE rowid = :id"), {"id": recipe.id})
+    index_recipes([recipe])
+
+
+def index_recipes(recipes):
+    # Neue (bereits geflushte) Rezepte in einem executemany indexieren
+    if not fts_enabled() or not recipes:
+        return
+    db.session.execute(
+        text(
+            "INSERT INTO recipe_fts(rowid, title, description, ingredients, steps) "
+            "VALUES (:id, :title, :description, :ingredients, :steps)"
+        ),
+        [
+            {
+                "id": r.id,
+                "title": r.title,
+                "description": r.description,
+                "ingredients": r.ingredients,
+                "steps": r.steps,
+            }
+            for r in recipes
+        ],
+    )
+
+
+def remove_recipe(recipe_id):
+    if not fts_enabled():
+        return
+    db.session.execute(text("DELETE FROM recipe_fts WHERE rowid = :id"), {"id": recipe_id})
+
+
+def rebuild_index():
+    create_index()
+    db.session.execute(text("DELETE FROM recipe_fts"))
+    result = db.session.execute(text(
+        "INSERT INTO recipe_fts(rowid, title, description, ingredients, steps) "
+        "SELECT id, title, description, ingredients, steps FROM recipe"
+    ))
+    db.session.execute(text("INSERT INTO recipe_fts(recipe_fts) VALUES ('optimize')"))
+    return result.rowcount
@@ -0,0 +1,126 @@
+import json
+from operator import attrgetter
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from . import images
+
+try:
+    import orjson
+except ImportError:  # orjson optional, sonst Standardbibliothek
+    orjson = None
+
+# Elemente pro Chunk beim Streamen (und pro Fetch vom Server-Cursor)
+STREAM_BATCH = 200
+
+
+if orjson is not None:
+    # Datumswerte wie bei Flask über default() (HTTP-Datum), nicht als ISO-String
+    _OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _default(obj):
+    # Typen, die orjson nicht kennt, wie Flask behandeln
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps_bytes(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode()
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask-JSON über orjson, falls installiert; eingerückte Ausgabe (Debug) bleibt bei json."""
+
+    def dumps(self, obj, **kwargs):
+        if "indent" in kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj)
+
+
+class Schema:
+    """Abbildung Modell -> dict. Felder: Name -> Funktion(obj)."""
+
+    def __init__(self, **fields):
+        self.fields = {name: attrgetter(name) if field is None else field for name, field in fields.items()}
+
+    def dump(self, obj, only=None):
+        return {name: self.fields[name](obj) for name in (only or self.fields)}
+
+    def dump_many(self, objs, only=None):
+        return [self.dump(obj, only) for obj in objs]
+
+
+def isoformat(name):
+    def get(obj):
+        value = getattr(obj, name)
+        return value.isoformat() if value is not None else None
+    return get
+
+
+def _images(recipe):
+    return {v: images.recipe_image(recipe.image_url, v) for v in images.VARIANTS} if recipe.image_url else None
+
+
+def _thumbnail(recipe):
+    return images.recipe_image(recipe.image_url, "thumb") if recipe.image_url else None
+
+
+recipe_schema = Schema(
+    id=None, title=None, description=None, ingredients=None, steps=None, category=None,
+    duration_min=None, difficulty=None, image_url=None, created_by=None,
+    created_at=isoformat("created_at"), updated_at=isoformat("updated_at"), version=None,
+    images=_images, thumbnail_url=_thumbnail,
+)
+comment_schema = Schema(id=None, text=None, user_id=None, created_at=isoformat("created_at"))
+# Kommentare mit Benutzername (wie im Event-Stream); Autor vorher per joinedload laden
+comment_author_schema = Schema(
+    id=None, text=None, user_id=None, created_at=isoformat("created_at"), username=lambda c: c.author.username,
+)
+author_schema = Schema(id=None, username=None)
+similar_schema = Schema(
+    id=lambda s: s.similar.id,
+    title=lambda s: s.similar.title,
+    category=lambda s: s.similar.category,
+    score=None,
+)
+
+
+def batched(iterable, size=STREAM_BATCH):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_array(batches, key, extra=None):
+    """Erzeugt {key: [...], **extra} Stück für Stück aus Batches von dicts.
+
+    Es liegt immer nur ein Batch serialisiert im Speicher.
+    """
+    yield b'{"' + key.encode() + b'":['
+    first = True
+    for batch in batches:
+        if not batch:
+            continue
+        chunk = b",".join(dumps_bytes(item) for item in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+    for name, value in sorted((extra or {}).items()):
+        yield b',"' + name.encode() + b'":' + dumps_bytes(value)
+    yield b"}\n"
+
+
+def streaming_response(batches, key, extra=None):
+    return current_app.response_class(
+        stream_with_context(stream_array(batches, key, extra)), mimetype="application/json"
+    )
@@ -0,0 +1,128 @@
+import time
+from array import array
+from datetime import datetime
+from . import db
+from .models import Recipe, Rating, Favorite, SimilarRecipe
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # nur für den Offline-Job nötig, nicht für das Ausliefern
+    np = sparse = None
+
+FAVORITE_WEIGHT = 1.0
+BLOCK_SIZE = 256
+
+
+def available():
+    return np is not None
+
+
+def _interactions():
+    # Gewichte: Bewertung 1-5 -> 0.2-1.0, Favorit 1.0; doppelte Paare werden summiert
+    users, items, weights = array("q"), array("q"), array("d")
+    ratings = db.session.query(Rating.user_id, Rating.recipe_id, Rating.stars)
+    favorites = db.session.query(Favorite.user_id, Favorite.recipe_id)
+    for user_id, recipe_id, stars in ratings.execution_options(yield_per=50000):
+        users.append(user_id)
+        items.append(recipe_id)
+        weights.append((stars or 0) / 5.0)
+    for user_id, recipe_id in favorites.execution_options(yield_per=50000):
+        users.append(user_id)
+        items.append(recipe_id)
+        weights.append(FAVORITE_WEIGHT)
+    return (
+        np.frombuffer(users, dtype=np.int64),
+        np.frombuffer(items, dtype=np.int64),
+        np.frombuffer(weights, dtype=np.float64),
+    )
+
+
+def changed_recipe_ids():
+    # Rezepte mit geänderten Interaktionen seit dem letzten Lauf. Neue, geänderte und
+    # entfernte Bewertungen/Favoriten erhöhen alle Recipe.version/updated_at
+    # (writebehind.apply), created_at der Zeilen bleibt dabei aber alt oder verschwindet.
+    last_run = db.session.query(db.func.max(SimilarRecipe.computed_at)).scalar()
+    if last_run is None:
+        return None
+    return {r for r, in db.session.query(Recipe.id).filter(Recipe.updated_at >= last_run)}
+
+
+def _store(recipe_ids, rows):
+    SimilarRecipe.query.filter(SimilarRecipe.recipe_id.in_(recipe_ids)).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(SimilarRecipe.__table__.insert(), rows)
+    db.session.commit()
+
+
+def build(k=10, time_budget=None, recipe_ids=None, block_size=BLOCK_SIZE):
+    """Top-k Item-Item-Nachbarn (Kosinus) aus Bewertungen und Favoriten berechnen.
+
+    Die Ähnlichkeiten werden blockweise als dünn besetztes Produkt X[block] · Xᵀ
+    gerechnet und nach jedem Block gespeichert; time_budget (Sekunden) bricht
+    nach dem laufenden Block ab. Gibt die Anzahl verarbeiteter Rezepte zurück.
+    """
+    started = time.monotonic()
+    now = datetime.utcnow()
+    users, items, weights = _interactions()
+    if not len(items):
+        return 0
+
+    item_ids, item_idx = np.unique(items, return_inverse=True)
+    _, user_idx = np.unique(users, return_inverse=True)
+    matrix = sparse.csr_matrix((weights, (item_idx, user_idx)))
+    matrix.sum_duplicates()
+
+    # Zeilen L2-normalisieren, dann ist X · Xᵀ direkt die Kosinus-Ähnlichkeit
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = sparse.diags(1.0 / norms).dot(matrix).tocsr()
+    transposed = normalized.T.tocsr()
+
+    targets = np.arange(len(item_ids))
+    if recipe_ids is not None:
+        wanted = np.fromiter(recipe_ids, dtype=np.int64)
+        targets = np.flatnonzero(np.isin(item_ids, wanted))
+        # Rezepte ohne verbliebene Interaktionen haben keine Nachbarn mehr
+        orphaned = wanted[~np.isin(wanted, item_ids)]
+        if len(orphaned):
+            _store([int(r) for r in orphaned], [])
+
+    done = 0
+    for start in range(0, len(targets), block_size):
+        if time_budget is not None and time.monotonic() - started > time_budget:
+            break
+        block = targets[start:start + block_size]
+        scores = normalized[block].dot(transposed).tocsr()
+        rows = []
+        for i, item in enumerate(block):
+            lo, hi = scores.indptr[i], scores.indptr[i + 1]
+            cols, vals = scores.indices[lo:hi], scores.data[lo:hi]
+            keep = (cols != item) & (vals > 0)
+            cols, vals = cols[keep], vals[keep]
+            if len(vals) > k:
+                top = np.argpartition(-vals, k)[:k]
+                cols, vals = cols[top], vals[top]
+            recipe_id = int(item_ids[item])
+            for rank, j in enumerate(np.argsort(-vals, kind="stable")):
+                rows.append({
+                    "recipe_id": recipe_id,
+                    "rank": rank,
+                    "similar_id": int(item_ids[cols[j]]),
+                    "score": round(float(vals[j]), 6),
+                    "computed_at": now,
+                })
+        _store([int(item_ids[i]) for i in block], rows)
+        done += len(block)
+
+    # Vollständiger Lauf: Einträge von Rezepten ohne Interaktionen entfernen
+    if recipe_ids is None and done == len(targets):
+        SimilarRecipe.query.filter(SimilarRecipe.computed_at < now).delete(synchronize_session=False)
+        db.session.commit()
+    return done
+
+
+def remove_recipe(recipe_id):
+    SimilarRecipe.query.filter(
+        db.or_(SimilarRecipe.recipe_id == recipe_id, SimilarRecipe.similar_id == recipe_id)
+    ).delete(synchronize_session=False)
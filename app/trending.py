@@ -0,0 +1,270 @@
+import atexit
+import bisect
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from . import db
+from .models import Rating, Favorite, Comment, TrendingScore
+
+log = logging.getLogger(__name__)
+
+# Gewicht pro Interaktion
+WEIGHTS = {"rating": 1.0, "comment": 2.0, "favorite": 3.0}
+# Nach so vielen Halbwertszeiten auf eine neue Epoche umrechnen (Gleitkomma-Überlauf)
+REBASE_AFTER = 32
+# Scores darunter fallen beim Umrechnen weg
+MIN_SCORE = 1e-3
+# Neuaufbau: ältere Ereignisse tragen weniger als 2^-16 bei und werden nicht gelesen
+HISTORY_HALF_LIVES = 16
+
+_board = None
+_app = None
+_interval = 0
+_thread = None
+_loaded = False
+_lock = threading.Lock()
+# Eigener Stand beim letzten Laden/Sichern; save() schreibt nur den Zuwachs seitdem
+_saved = {}
+_saved_at = 0.0
+
+
+def _timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class Leaderboard:
+    """Scores mit exponentiellem Zerfall und sortierte Top-k-Liste.
+
+    Gespeichert wird gewicht * 2^((t - epoch) / half_life) statt des aktuellen Werts. Der
+    Zerfall trifft alle Rezepte gleich, die Reihenfolge ändert sich also nur durch neue
+    Ereignisse; da die Scores so nur wachsen, muss pro Ereignis nur das eine Rezept in
+    der Top-k-Liste nachgeführt werden (O(k)).
+    """
+
+    def __init__(self, size=100, half_life=86400.0):
+        self.size = size
+        self.half_life = half_life
+        self.epoch = time.time()
+        self.dirty = False
+        self._scores = {}
+        self._top = []  # [(-score, recipe_id)], beste zuerst
+        self._lock = threading.Lock()
+
+    def _growth(self, at):
+        return 2.0 ** ((at - self.epoch) / self.half_life)
+
+    def add(self, recipe_id, weight, at=None):
+        at = time.time() if at is None else at
+        with self._lock:
+            if at - self.epoch > REBASE_AFTER * self.half_life:
+                self._rebase(at)
+            score = self._scores.get(recipe_id, 0.0) + weight * self._growth(at)
+            self._scores[recipe_id] = score
+            self._promote(recipe_id, score)
+            self.dirty = True
+
+    def _promote(self, recipe_id, score):
+        for i, (_, rid) in enumerate(self._top):
+            if rid == recipe_id:
+                del self._top[i]
+                break
+        else:
+            # Außerhalb der Liste liegt kein Score über dem letzten Platz
+            if len(self._top) >= self.size and -self._top[-1][0] >= score:
+                return
+        bisect.insort(self._top, (-score, recipe_id))
+        del self._top[self.size:]
+
+    def _rebuild_top(self):
+        best = heapq.nlargest(self.size, self._scores.items(), key=lambda item: item[1])
+        self._top = sorted((-score, rid) for rid, score in best)
+
+    def _rebase(self, at):
+        factor = self._growth(at)
+        self._scores = {rid: s / factor for rid, s in self._scores.items() if s / factor >= MIN_SCORE}
+        self.epoch = at
+        self._rebuild_top()
+
+    def remove(self, recipe_id):
+        with self._lock:
+            if self._scores.pop(recipe_id, None) is None:
+                return
+            if any(rid == recipe_id for _, rid in self._top):
+                self._rebuild_top()
+            self.dirty = True
+
+    def top(self, limit=None, at=None):
+        """[(recipe_id, aktueller Score)], beste zuerst."""
+        at = time.time() if at is None else at
+        with self._lock:
+            factor = self._growth(at)
+            return [(rid, -score / factor) for score, rid in self._top[:limit]]
+
+    def snapshot(self, at=None):
+        """Alle Scores zum Zeitpunkt at; setzt dirty zurück."""
+        at = time.time() if at is None else at
+        with self._lock:
+            factor = self._growth(at)
+            self.dirty = False
+            return {rid: s / factor for rid, s in self._scores.items()}
+
+    def load(self, scores, at=None):
+        with self._lock:
+            self.epoch = time.time() if at is None else at
+            self._scores = {rid: s for rid, s in scores.items() if s >= MIN_SCORE}
+            self._rebuild_top()
+
+
+def init_app(app):
+    global _board, _app, _interval
+    _app = app
+    _interval = app.config.get("TRENDING_PERSIST_SECONDS", 300)
+    _board = Leaderboard(
+        size=app.config.get("TRENDING_SIZE", 100),
+        half_life=app.config.get("TRENDING_HALF_LIFE_HOURS", 24) * 3600.0,
+    )
+
+
+def _stored(query, now):
+    # Gesicherte Scores, auf den Zeitpunkt now umgerechnet
+    return {
+        row.recipe_id: row.score * 2.0 ** ((_timestamp(row.saved_at) - now) / _board.half_life)
+        for row in query
+    }
+
+
+def _ensure_loaded():
+    # Gesicherten Stand beim ersten Zugriff laden (Tabelle fehlt evtl. vor der Migration)
+    global _loaded, _saved, _saved_at
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        now = time.time()
+        if db.inspect(db.engine).has_table(TrendingScore.__tablename__):
+            _board.load(_stored(TrendingScore.query, now), now)
+        _saved, _saved_at = _board.snapshot(now), now
+        _loaded = True
+
+
+def _persist_loop():
+    while True:
+        time.sleep(_interval)
+        try:
+            save()
+        except Exception:
+            log.exception("Trending-Scores konnten nicht gesichert werden")
+
+
+def _start_persisting():
+    global _thread
+    if _thread is not None or _interval <= 0:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_persist_loop, name="trending-persist", daemon=True)
+            _thread.start()
+            atexit.register(save)
+
+
+def record(recipe_id, kind):
+    """Interaktion (rating, comment, favorite) zählen; ohne Datenbankzugriff."""
+    if _board is None or not _board.size:
+        return
+    _ensure_loaded()
+    _board.add(recipe_id, WEIGHTS[kind])
+    _start_persisting()
+
+
+def remove(recipe_id):
+    if _board is not None:
+        _board.remove(recipe_id)
+    TrendingScore.query.filter_by(recipe_id=recipe_id).delete()
+
+
+def top(limit=None):
+    if _board is None or not _board.size:
+        return []
+    _ensure_loaded()
+    return _board.top(limit)
+
+
+def size():
+    return _board.size if _board is not None else 0
+
+
+def save(replace=False):
+    """Zuwachs dieses Prozesses seit dem letzten Sichern in die Tabelle einrechnen.
+
+    Mehrere Worker sichern so unabhängig voneinander, ohne sich gegenseitig zu
+    überschreiben. replace=True ersetzt den Stand (nach rebuild()). Liefert die
+    Anzahl der gesicherten Rezepte.
+    """
+    global _saved, _saved_at
+    if _board is None or not _board.dirty:
+        return 0
+    now = time.time()
+    scores = _board.snapshot(now)
+    saved_at = datetime.utcfromtimestamp(now)
+    with _app.app_context():
+        try:
+            # Vor dem Lesen sperren, damit parallele Worker nacheinander einrechnen: das leere
+            # UPDATE startet unter SQLite die Schreibtransaktion, FOR UPDATE sperrt unter Postgres
+            table = TrendingScore.__table__
+            db.session.execute(db.update(table).where(db.false()).values(score=table.c.score))
+            stored = _stored(TrendingScore.query.with_for_update(), now)
+            merged = dict(scores) if replace else dict(stored)
+            if not replace:
+                decay = 2.0 ** ((_saved_at - now) / _board.half_life)
+                for rid, score in scores.items():
+                    gained = score - _saved.get(rid, 0.0) * decay
+                    if gained > 0:
+                        merged[rid] = merged.get(rid, 0.0) + gained
+            keep = {rid: score for rid, score in merged.items() if score >= MIN_SCORE}
+            dropped = stored.keys() - keep.keys()
+            if dropped:
+                TrendingScore.query.filter(TrendingScore.recipe_id.in_(dropped)).delete(synchronize_session=False)
+            updates = [{"rid": rid, "score": score} for rid, score in keep.items() if rid in stored]
+            if updates:
+                db.session.execute(
+                    db.update(table).where(table.c.recipe_id == db.bindparam("rid"))
+                    .values(score=db.bindparam("score"), saved_at=saved_at),
+                    updates,
+                )
+            inserts = [
+                {"recipe_id": rid, "score": score, "saved_at": saved_at}
+                for rid, score in keep.items() if rid not in stored
+            ]
+            if inserts:
+                db.session.execute(db.insert(table), inserts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            _board.dirty = True
+            raise
+    _saved, _saved_at = scores, now
+    return len(keep)
+
+
+def rebuild():
+    """Scores aus Bewertungen, Favoriten und Kommentaren neu berechnen.
+
+    Gilt für diesen Prozess; laufende Worker übernehmen den gesicherten Stand beim Neustart.
+    """
+    global _loaded
+    now = time.time()
+    since = datetime.utcfromtimestamp(now - HISTORY_HALF_LIVES * _board.half_life)
+    board = Leaderboard(_board.size, _board.half_life)
+    board.epoch = now
+    for kind, model in (("rating", Rating), ("favorite", Favorite), ("comment", Comment)):
+        rows = db.session.query(model.recipe_id, model.created_at).filter(model.created_at >= since)
+        for recipe_id, created_at in rows.yield_per(1000):
+            board.add(recipe_id, WEIGHTS[kind], _timestamp(created_at))
+    scores = board.snapshot(now)
+    _board.load(scores, now)
+    _board.dirty = True
+    _loaded = True
+    return len(scores)
@@ -0,0 +1,314 @@
+import atexit
+import logging
+import threading
+from datetime import datetime
+from . import db, httpcache, images, events, activity, trending, queries
+from .models import Recipe, Rating, Favorite
+
+log = logging.getLogger(__name__)
+
+# Zusammenfassbare Schreibvorgänge, Schlüssel -> letzter Wert:
+#   ("rating", recipe_id, user_id)   -> Sterne
+#   ("favorite", recipe_id, user_id) -> True (hinzufügen) / False (entfernen)
+#   ("touch", recipe_id)             -> None (Version erhöhen)
+#   ("discard", url, recipe_id)      -> None (altes Bild löschen, nach dem Commit)
+MAX_RETRIES = 3
+
+_queue = None
+
+
+class WriteBehindQueue:
+    """Sammelt Schreibvorgänge und schreibt sie gebündelt aus einem Hintergrund-Thread.
+
+    Spätestens nach `delay` Sekunden oder bei `max_batch` offenen Einträgen wird
+    geschrieben; beim Beenden des Prozesses wird der Rest synchron geleert.
+    """
+
+    def __init__(self, app, delay=0.2, max_batch=500):
+        self.app = app
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending = {}
+        self._retries = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self.batches = 0
+        self.written = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, value):
+        with self._cond:
+            self._pending[key] = value
+            size = len(self._pending)
+            if size >= self.max_batch:
+                self._cond.notify()
+        if size >= self.max_batch * 4:
+            # Hintergrund-Thread kommt nicht hinterher: im Request mitschreiben
+            self.flush()
+
+    def pending(self, key, default=None):
+        with self._cond:
+            return self._pending.get(key, default)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped and len(self._pending) < self.max_batch:
+                    self._cond.wait(timeout=self.delay)
+                if self._stopped:
+                    return
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            with self.app.app_context():
+                failed = self._write(batch)
+            self.batches += 1
+            self.written += len(batch) - len(failed)
+            for key in batch:
+                if key not in failed:
+                    self._retries.pop(key, None)
+            if failed:
+                self._requeue(failed)
+
+    def _write(self, batch):
+        """Schreibt den Batch; schlägt er fehl, werden die Hälften einzeln geschrieben.
+
+        So bleibt nur der fehlerhafte Eintrag übrig, der Rest landet in der Datenbank.
+        Gibt die fehlgeschlagenen Einträge zurück.
+        """
+        try:
+            apply(batch)
+            return {}
+        except Exception:
+            db.session.rollback()
+            if len(batch) == 1:
+                log.exception("Write-Behind-Eintrag %r fehlgeschlagen", next(iter(batch)))
+                return batch
+            log.warning("Write-Behind-Batch mit %d Einträgen fehlgeschlagen, wird geteilt", len(batch))
+        items = list(batch.items())
+        middle = len(items) // 2
+        failed = self._write(dict(items[:middle]))
+        failed.update(self._write(dict(items[middle:])))
+        return failed
+
+    def _requeue(self, batch):
+        with self._cond:
+            for key, value in batch.items():
+                attempts = self._retries.get(key, 0) + 1
+                if attempts > MAX_RETRIES:
+                    log.error("Write-Behind verwirft %r nach %d Versuchen", key, MAX_RETRIES)
+                    self._retries.pop(key, None)
+                    continue
+                self._retries[key] = attempts
+                # Neuere Werte aus der Zwischenzeit haben Vorrang
+                self._pending.setdefault(key, value)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {"pending": pending, "batches": self.batches, "written": self.written}
+
+
+def init_app(app):
+    global _queue
+    if not app.config.get("WRITE_BEHIND", False) or _queue is not None:
+        return
+    _queue = WriteBehindQueue(
+        app,
+        delay=app.config.get("WRITE_BEHIND_DELAY_MS", 200) / 1000.0,
+        max_batch=app.config.get("WRITE_BEHIND_MAX_BATCH", 500),
+    )
+    atexit.register(_queue.stop)
+
+
+def _upsert_statement(model, index_elements, update_columns):
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    stmt = insert(model)
+    if update_columns:
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+    return stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+
+def _pairs_filter(model, pairs):
+    # Zwei IN-Listen statt (a, b) IN (...): nutzt unter SQLite den Unique-Index
+    return (
+        model.recipe_id.in_({r for r, _ in pairs}),
+        model.user_id.in_({u for _, u in pairs}),
+    )
+
+
+def _write_ratings(ratings, now, counters, created):
+    # ratings: {(recipe_id, user_id): stars}
+    rows = [
+        {"recipe_id": recipe_id, "user_id": user_id, "stars": stars, "created_at": now}
+        for (recipe_id, user_id), stars in ratings.items()
+    ]
+    stmt = _upsert_statement(Rating, ["recipe_id", "user_id"], None)
+    if stmt is not None:
+        # Neu ist, was das INSERT selbst anlegt, nicht was vorher gelesen wurde: zwei Writer
+        # (Hintergrund-Thread, Flush im Request, weitere Worker) zählen nie beide dieselbe Stimme
+        inserted = {
+            (row.recipe_id, row.user_id)
+            for row in db.session.execute(stmt.returning(Rating.recipe_id, Rating.user_id), rows)
+        }
+    else:
+        existing = set(
+            tuple(row) for row in
+            db.session.query(Rating.recipe_id, Rating.user_id).filter(*_pairs_filter(Rating, ratings))
+        )
+        inserted = {key for key in ratings if key not in existing}
+        if inserted:
+            db.session.execute(db.insert(Rating), [row for row in rows if (row["recipe_id"], row["user_id"]) in inserted])
+
+    changed = [row for row in rows if (row["recipe_id"], row["user_id"]) not in inserted]
+    if changed:
+        table = Rating.__table__
+        db.session.execute(
+            db.update(table)
+            .where(table.c.recipe_id == db.bindparam("rid"), table.c.user_id == db.bindparam("uid"))
+            .values(stars=db.bindparam("new_stars")),
+            [{"rid": row["recipe_id"], "uid": row["user_id"], "new_stars": row["stars"]} for row in changed],
+        )
+    for recipe_id, user_id in inserted:
+        activity.add(counters, user_id, "rating_count")
+        created.append((recipe_id, "rating"))
+
+    # Aggregate in derselben Transaktion aus der Tabelle nachzählen statt Deltas zu addieren
+    recipe_ids = {recipe_id for recipe_id, _ in ratings}
+    Recipe.recount_ratings(recipe_ids)
+    return recipe_ids
+
+
+def _write_favorites(added, removed, now, counters, created):
+    if added:
+        # Bestehende vorher lesen: nur wirklich neue zählen für favorite_count
+        existing = set(
+            tuple(row) for row in
+            db.session.query(Favorite.recipe_id, Favorite.user_id).filter(*_pairs_filter(Favorite, added))
+        )
+        new = [{"recipe_id": r, "user_id": u, "created_at": now} for r, u in added if (r, u) not in existing]
+        if new:
+            # Upsert trotzdem, falls ein paralleler Request denselben Favoriten anlegt
+            stmt = _upsert_statement(Favorite, ["recipe_id", "user_id"], None)
+            db.session.execute(stmt if stmt is not None else db.insert(Favorite), new)
+        for row in new:
+            activity.add(counters, row["user_id"], "favorite_count")
+            created.append((row["recipe_id"], "favorite"))
+    if removed:
+        removed_set = set(removed)
+        rows = [
+            row for row in db.session.query(Favorite.id, Favorite.recipe_id, Favorite.user_id)
+            .filter(*_pairs_filter(Favorite, removed))
+            if (row.recipe_id, row.user_id) in removed_set
+        ]
+        if rows:
+            Favorite.query.filter(Favorite.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        for row in rows:
+            activity.add(counters, row.user_id, "favorite_count", -1)
+    return {r for r, _ in added} | {r for r, _ in removed}
+
+
+def apply(batch):
+    """Schreibt einen Batch in einer Transaktion; Bild-Löschungen laufen nach dem Commit."""
+    now = datetime.utcnow()
+    ratings, added, removed, touched, discards = {}, [], [], set(), []
+    for key, value in batch.items():
+        kind = key[0]
+        if kind == "rating":
+            ratings[key[1:]] = value
+        elif kind == "favorite":
+            (added if value else removed).append(key[1:])
+        elif kind == "touch":
+            touched.add(key[1])
+        elif kind == "discard":
+            discards.append(key[1:])
+
+    # recount_ratings erhöht die Version bereits
+    # Wirklich neue Bewertungen/Favoriten (nicht geänderte oder doppelte) für Trending
+    counters, created = {}, []
+    rated = _write_ratings(ratings, now, counters, created) if ratings else set()
+    touched |= _write_favorites(added, removed, now, counters, created)
+    activity.apply(db.session, counters)
+    touched -= rated
+    if touched:
+        Recipe.query.filter(Recipe.id.in_(touched)).update({
+            Recipe.version: Recipe.version + 1,
+            Recipe.updated_at: now,
+        }, synchronize_session=False)
+    httpcache.mark_changed(db.session, touched | rated)
+    db.session.commit()
+    # Offene Event-Streams (SSE) bekommen die neuen Durchschnittswerte
+    events.ratings_changed(rated)
+    for recipe_id, kind in created:
+        trending.record(recipe_id, kind)
+
+    for url, recipe_id in discards:
+        images.discard(url, recipe_id)
+
+
+def _submit(key, value=None):
+    # Ohne Queue sofort und über denselben Code-Pfad schreiben; True = nur eingereiht
+    if _queue is None:
+        apply({key: value})
+        return False
+    _queue.submit(key, value)
+    return True
+
+
+def rate(recipe_id, user_id, stars):
+    return _submit(("rating", recipe_id, user_id), stars)
+
+
+def favorite(recipe_id, user_id, add=True):
+    return _submit(("favorite", recipe_id, user_id), add)
+
+
+def touch(recipe_id):
+    return _submit(("touch", recipe_id))
+
+
+def discard_image(url, recipe_id):
+    return _submit(("discard", url, recipe_id))
+
+
+def pending_rating(recipe_id, user_id):
+    return _queue.pending(("rating", recipe_id, user_id)) if _queue is not None else None
+
+
+def pending_favorite(recipe_id, user_id):
+    return _queue.pending(("favorite", recipe_id, user_id)) if _queue is not None else None
+
+
+def is_favorite(recipe_id, user_id):
+    # Aktueller Stand inklusive noch nicht geschriebener Änderungen
+    pending = pending_favorite(recipe_id, user_id)
+    if pending is not None:
+        return pending
+    return db.session.query(queries.user_favorite(recipe_id, user_id).exists()).scalar()
+
+
+def stats():
+    return _queue.stats() if _queue is not None else {"pending": 0, "batches": 0, "written": 0}
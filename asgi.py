@@ -0,0 +1,5 @@
+from run import app as flask_app
+from app.aio import create_asgi_app
+
+# z.B. uvicorn asgi:app --workers 2; lesende API-Endpunkte laufen asynchron
+app = create_asgi_app(flask_app)
@@ -0,0 +1,122 @@
+"""Synthetischer Datensatz für Benchmarks.
+
+Erzeugt reproduzierbar (fester Seed) Nutzer, Rezepte sowie Bewertungen,
+Favoriten und Kommentare mit Zipf-artiger Popularität: wenige Rezepte bekommen
+viele Interaktionen, die meisten nur wenige.
+"""
+import random
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from app import db, search, ingredients, facets
+from app.models import User, Recipe, Rating, Favorite, Comment
+
+PASSWORD = "benchmark"
+BATCH_SIZE = 5000
+EPOCH = datetime(2025, 1, 1)
+
+CATEGORIES = ["Hauptgericht", "Dessert", "Vorspeise", "Salat", "Suppe", "Frühstück", "Snack", "Getränk"]
+DIFFICULTIES = ["Einfach", "Mittel", "Schwer"]
+ADJECTIVES = ["Schnelle", "Cremige", "Würzige", "Klassische", "Vegane", "Herzhafte", "Leichte", "Omas"]
+DISHES = ["Pasta", "Suppe", "Pfanne", "Bowl", "Torte", "Auflauf", "Curry", "Salat", "Quiche", "Risotto"]
+PANTRY = [
+    "Hühnchen", "Reis", "Nudeln", "Tomaten", "Zwiebel", "Knoblauch", "Paprika", "Karotten",
+    "Kartoffeln", "Sahne", "Milch", "Butter", "Eier", "Mehl", "Zucker", "Salz", "Pfeffer",
+    "Olivenöl", "Parmesan", "Mozzarella", "Basilikum", "Petersilie", "Zitrone", "Spinat",
+    "Linsen", "Kichererbsen", "Tofu", "Lachs", "Rindfleisch", "Speck", "Champignons", "Zucchini",
+]
+UNITS = ["g", "ml", "EL", "TL", "Stück", "Prise"]
+WORDS = "lecker super einfach nachgekocht perfekt würzig zart etwas mehr salz beim nächsten mal".split()
+
+
+def _zipf_weights(n, s=1.1):
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(model.__table__.insert(), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def _ingredients(rng):
+    lines = rng.sample(PANTRY, rng.randint(4, 12))
+    return "\n".join(f"{rng.randint(1, 500)} {rng.choice(UNITS)} {name}" for name in lines)
+
+
+def _pairs(rng, users, recipe_ids, cum_weights, per_user_mean):
+    # Eindeutige (user, recipe)-Paare, Rezeptwahl nach Popularität
+    for user_id in users:
+        count = min(int(rng.expovariate(1.0 / per_user_mean)) + 1, len(recipe_ids))
+        for recipe_id in set(rng.choices(recipe_ids, cum_weights=cum_weights, k=count)):
+            yield user_id, recipe_id
+
+
+def seed(users=100, recipes=1000, ratings_per_user=20, favorites_per_user=8, comments_per_user=5, seed=42):
+    """Legt den Datensatz über die Modelle an und baut alle abgeleiteten Daten auf."""
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD, method="pbkdf2:sha256")
+
+    _insert(User, [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@example.com",
+         "password_hash": password_hash, "is_admin": i == 1, "created_at": EPOCH}
+        for i in range(1, users + 1)
+    ])
+    user_ids = list(range(1, users + 1))
+    author_weights = _zipf_weights(users, s=0.8)
+
+    recipe_rows = []
+    for i in range(1, recipes + 1):
+        recipe_rows.append({
+            "id": i,
+            "title": f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {i}",
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(8, 40))),
+            "ingredients": _ingredients(rng),
+            "steps": "\n".join(" ".join(rng.choices(WORDS, k=12)) for _ in range(rng.randint(3, 8))),
+            "category": rng.choice(CATEGORIES),
+            "duration_min": rng.choice([10, 15, 20, 30, 45, 60, 90, 120]),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "created_by": rng.choices(user_ids, weights=author_weights)[0],
+            "created_at": EPOCH + timedelta(minutes=rng.randint(0, 60 * 24 * 600)),
+        })
+    _insert(Recipe, recipe_rows)
+
+    recipe_ids = list(range(1, recipes + 1))
+    rng.shuffle(recipe_ids)
+    cum_weights = []
+    total = 0.0
+    for w in _zipf_weights(recipes):
+        total += w
+        cum_weights.append(total)
+
+    # Sterne eher positiv verteilt, wie bei echten Bewertungen
+    _insert(Rating, [
+        {"user_id": u, "recipe_id": r, "stars": rng.choices([1, 2, 3, 4, 5], weights=[5, 8, 17, 35, 35])[0],
+         "created_at": EPOCH + timedelta(minutes=rng.randint(0, 60 * 24 * 600))}
+        for u, r in _pairs(rng, user_ids, recipe_ids, cum_weights, ratings_per_user)
+    ])
+    _insert(Favorite, [
+        {"user_id": u, "recipe_id": r, "created_at": EPOCH + timedelta(minutes=rng.randint(0, 60 * 24 * 600))}
+        for u, r in _pairs(rng, user_ids, recipe_ids, cum_weights, favorites_per_user)
+    ])
+    _insert(Comment, [
+        {"user_id": u, "recipe_id": r, "text": " ".join(rng.choices(WORDS, k=rng.randint(3, 20))),
+         "created_at": EPOCH + timedelta(minutes=rng.randint(0, 60 * 24 * 600))}
+        for u, r in _pairs(rng, user_ids, recipe_ids, cum_weights, comments_per_user)
+    ])
+
+    # Abgeleitete Daten wie im Betrieb
+    Recipe.recount_ratings()
+    db.session.commit()
+    if search.fts_supported():
+        search.rebuild_index()
+        db.session.commit()
+    ingredients.rebuild_index()
+    facets.rebuild()
+    db.session.commit()
+    return {
+        "users": users,
+        "recipes": recipes,
+        "ratings": Rating.query.count(),
+        "favorites": Favorite.query.count(),
+        "comments": Comment.query.count(),
+    }
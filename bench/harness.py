@@ -0,0 +1,250 @@
+"""Benchmark-Harness: treibt alle Routen über den Flask-Testclient.
+
+    python -m bench.harness --users 200 --recipes 5000 --requests 100 \
+        --output bench/results.json [--baseline bench/baseline.json --tolerance 0.25] [--memory]
+
+Pro Endpunkt werden Latenz-Perzentile, Durchsatz und SQL-Queries pro Request
+gemessen und als JSON gespeichert. Liefert ein Szenario einen anderen Status als
+erwartet (Fehlerseite, Redirect auf /login, 429 ...), endet der Lauf mit Exit-Code 1.
+Mit --baseline ebenso, wenn ein Endpunkt langsamer wird (p95 über Toleranz), mehr
+Queries braucht oder andere Statuscodes liefert als in der Baseline.
+Mit --memory wird zusätzlich der Spitzenverbrauch (tracemalloc) pro Request erfasst.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import event
+
+# (Name, Methode, Pfad, Request-Argumente); {recipe} = populärstes Rezept.
+# "expect" = erlaubte Statuscodes, ohne Angabe nur 200.
+SCENARIOS = [
+    ("index", "GET", "/", {"expect": {302}}),
+    ("recipes.index", "GET", "/recipes/", {}),
+    ("recipes.index.rating", "GET", "/recipes/?sort=rating", {}),
+    ("recipes.index.page5", "GET", "/recipes/?page=5", {}),
+    ("recipes.index.category", "GET", "/recipes/?category=Dessert", {}),
+    ("recipes.index.facets", "GET", "/recipes/?category=Dessert&category=Suppe&difficulty=Einfach&duration=16-30", {}),
+    ("recipes.index.search", "GET", "/recipes/?q=pasta", {}),
+    ("recipes.view", "GET", "/recipes/{recipe}", {}),
+    ("recipes.favorites", "GET", "/recipes/favorites", {}),
+    ("recipes.edit.form", "GET", "/recipes/{recipe}/edit", {}),
+    ("recipes.create.form", "GET", "/recipes/new", {}),
+    ("recipes.create", "POST", "/recipes/new", {"data": {"title": "Benchmark", "ingredients": "Reis\nSalz"}, "expect": {302}}),
+    ("auth.profile", "GET", "/profile", {}),
+    ("auth.profile_page", "GET", "/profile/favorites", {}),
+    ("auth.profile_page.recipes", "GET", "/profile/recipes", {}),
+    ("recipes.rate", "POST", "/recipes/{recipe}/rate", {"data": {"stars": 4}, "expect": {302}}),
+    ("recipes.comment", "POST", "/recipes/{recipe}/comment", {"data": {"text": "Benchmark"}, "expect": {302}}),
+    ("recipes.favorite", "POST", "/recipes/{recipe}/favorite", {"expect": {302}}),
+    ("recipes.unfavorite", "POST", "/recipes/{recipe}/unfavorite", {"expect": {302}}),
+    ("api.list_recipes", "GET", "/api/recipes", {}),
+    ("api.list_recipes.legacy_page", "GET", "/api/recipes?page=20", {}),
+    ("api.list_recipes.batch", "GET", "/api/recipes?ids={recipe},1,2,3,4&include=author,rating_summary,comments", {}),
+    ("api.get_recipe", "GET", "/api/recipes/{recipe}", {}),
+    ("api.get_comments", "GET", "/api/recipes/{recipe}/comments", {}),
+    ("api.get_comments.stream", "GET", "/api/recipes/{recipe}/comments?stream=1", {}),
+    ("api.similar_recipes", "GET", "/api/recipes/{recipe}/similar", {}),
+    ("api.search_recipes", "GET", "/api/search?q=curry", {}),
+    ("api.list_facets", "GET", "/api/facets", {}),
+    ("api.recipes_by_ingredients", "GET", "/api/recipes/by-ingredients?have=Reis,Hühnchen,Zwiebel", {}),
+    ("api.trending_recipes", "GET", "/api/recipes/trending", {}),
+    ("api.list_favorites", "GET", "/api/favorites", {"auth": True}),
+    ("api.rate_recipe", "POST", "/api/recipes/{recipe}/ratings", {"auth": True, "json": {"stars": 5}}),
+    ("api.create_comment", "POST", "/api/recipes/{recipe}/comments", {"auth": True, "json": {"text": "Benchmark"}, "expect": {201}}),
+    ("api.add_favorite", "POST", "/api/recipes/{recipe}/favorite", {"auth": True, "expect": {200, 201}}),
+    ("api.remove_favorite", "DELETE", "/api/recipes/{recipe}/favorite", {"auth": True}),
+    ("api.create_recipe", "POST", "/api/recipes", {"auth": True, "json": {"title": "Benchmark", "ingredients": "Reis\nSalz"}, "expect": {201}}),
+]
+# Routen, die bewusst nicht im Lastlauf stecken (Login-Flows, Zerstörung, Voll-Export)
+EXCLUDED_ENDPOINTS = {
+    "static", "auth.login", "auth.register", "auth.logout", "recipes.delete", "api.get_token",
+    "api.bulk_import", "api.export_recipes", "api.cache_stats",
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def run_scenario(client, method, path, kwargs, token, requests, warmup, counter, memory=False):
+    options = {k: v for k, v in kwargs.items() if k not in ("auth", "expect")}
+    if kwargs.get("auth"):
+        options["headers"] = {"Authorization": f"Bearer {token}"}
+
+    for _ in range(warmup):
+        client.open(path, method=method, **options)
+
+    latencies, queries, statuses, peak = [], 0, set(), 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        before = counter.count
+        if memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, **options)
+        response.get_data()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        if memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        queries += counter.count - before
+        statuses.add(response.status_code)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "method": method,
+        "path": path,
+        "requests": requests,
+        "statuses": sorted(statuses),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p90_ms": round(percentile(latencies, 90), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "queries_per_request": round(queries / requests, 2),
+    }
+    if memory:
+        result["peak_kib"] = round(peak / 1024.0, 1)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Liste der Regressionen gegenüber der Baseline."""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {previous['queries_per_request']} -> {current['queries_per_request']}"
+            )
+        # Ältere Baselines ohne Statuscodes werden nur auf Zeiten und Queries geprüft
+        if "statuses" in previous and current["statuses"] != previous["statuses"]:
+            regressions.append(f"{name}: status {previous['statuses']} -> {current['statuses']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50, help="Requests pro Endpunkt")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", action="append", help="Nur diese Szenarien (mehrfach möglich)")
+    parser.add_argument("--output", default="bench/results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte p95-Verschlechterung (0.25 = 25%%)")
+    parser.add_argument("--memory", action="store_true", help="Spitzenverbrauch pro Request messen (langsamer)")
+    args = parser.parse_args(argv)
+
+    # Eigene Wegwerf-Datenbank, muss vor dem Import der App gesetzt sein
+    workdir = tempfile.mkdtemp(prefix="rezept-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # Gemessen wird die App, nicht der Schutz davor: ohne Rate-Limits und Lastabwehr
+    # liefen die meisten API-Szenarien in 429/503 und sähen schneller aus
+    os.environ["RATE_LIMITS"] = json.dumps({"api": None})
+    os.environ["SHED_MAX_CONCURRENCY"] = "0"
+
+    from app import create_app, db
+    from bench import generate
+
+    app = create_app()
+    app.config["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+    with app.app_context():
+        db.create_all()
+        dataset = generate.seed(args.users, args.recipes, seed=args.seed)
+        from app.models import Rating
+        popular = (
+            db.session.query(Rating.recipe_id)
+            .group_by(Rating.recipe_id)
+            .order_by(db.func.count().desc(), Rating.recipe_id)
+            .limit(1)
+            .scalar()
+        ) or 1
+        counter = QueryCounter(db.engines.values())
+
+    # Szenario-Namen beginnen mit dem Endpunkt ("recipes.index.rating" -> "recipes.index")
+    covered = {".".join(name.split(".")[:2]) for name, *_ in SCENARIOS}
+    missing = sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.endpoint not in covered and rule.endpoint not in EXCLUDED_ENDPOINTS
+    )
+    if missing:
+        print(f"Warnung: Endpunkte ohne Szenario: {', '.join(missing)}", file=sys.stderr)
+
+    client = app.test_client()
+    client.post("/login", data={"username": "user1", "password": generate.PASSWORD})
+    basic = base64.b64encode(f"user1:{generate.PASSWORD}".encode()).decode()
+    token = client.post("/api/token", headers={"Authorization": f"Basic {basic}"}).get_json()["token"]
+
+    results = {"dataset": dataset, "requests_per_endpoint": args.requests, "endpoints": {}}
+    unexpected = []
+    if args.memory:
+        tracemalloc.start()
+    for name, method, path, kwargs in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        with app.app_context():
+            stats = run_scenario(
+                client, method, path.format(recipe=popular), kwargs, token, args.requests, args.warmup, counter,
+                memory=args.memory,
+            )
+        results["endpoints"][name] = stats
+        expected = kwargs.get("expect", {200})
+        if not set(stats["statuses"]) <= expected:
+            unexpected.append(f"{name}: status {stats['statuses']}, erwartet {sorted(expected)}")
+        memory = f"  {stats['peak_kib']:8.1f} KiB" if args.memory else ""
+        print(f"{name:36} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+              f"{stats['throughput_rps']:8.1f} req/s  {stats['queries_per_request']:6.2f} q/req{memory}  {stats['statuses']}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Ergebnisse gespeichert: {args.output}")
+
+    # Fehler- oder Redirect-Antworten sind schnell und würden als Verbesserung durchgehen
+    failed = False
+    if unexpected:
+        print("Unerwartete Statuscodes:", file=sys.stderr)
+        for line in unexpected:
+            print(f"  {line}", file=sys.stderr)
+        failed = True
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressionen gegenüber der Baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("Keine Regressionen gegenüber der Baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
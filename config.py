@@ -1,9 +1,100 @@
+import json
 import os
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
 
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "supersecretkey"
     JWT_SECRET = os.environ.get("JWT_SECRET") or "jwt-super-secret-key"
-    SQLALCHEMY_DATABASE_URI = "sqlite:///app.db"
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or "sqlite:///app.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Zusätzliche Engine-Optionen als JSON, z.B. {"pool_size": 10, "max_overflow": 20}
+    SQLALCHEMY_ENGINE_OPTIONS = json.loads(os.environ.get("SQLALCHEMY_ENGINE_OPTIONS") or "{}")
+    # Optionale Read-Engine/Replica; bei SQLite auf dieselbe Datei zeigen lassen (WAL-Leser)
+    SQLALCHEMY_BINDS = {"replica": os.environ["READ_DATABASE_URL"]} if os.environ.get("READ_DATABASE_URL") else {}
+    DB_ROUTE_READS = os.environ.get("DB_ROUTE_READS", "1") == "1"
+    # Pro SQLite-Verbindung gesetzte Pragmas
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "cache_size": -20000,  # ~20 MB Page-Cache
+        "temp_store": "MEMORY",
+        "mmap_size": 256 * 1024 * 1024,
+    }
+    # ASGI-Variante (asgi.py): asynchroner Treiber, Standard aus der URL der Read- bzw. Haupt-Engine abgeleitet
+    ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL")
+    # Tausende wartende Requests teilen sich den Pool; lieber länger warten als 500 liefern
+    ASYNC_ENGINE_OPTIONS = json.loads(os.environ.get("ASYNC_ENGINE_OPTIONS") or '{"pool_size": 20, "pool_timeout": 60}')
+    # Threads für alle Routen, die in der ASGI-Variante weiter über WSGI laufen
+    ASYNC_WSGI_THREADS = int(os.environ.get("ASYNC_WSGI_THREADS", 8))
     UPLOAD_FOLDER = "app/static/uploads"
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
+
+    # HTTP-Caching der lesenden API-Endpunkte
+    API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", 0))
+    # Prozessinterner Response-Cache (0 = aus)
+    API_RESPONSE_CACHE_SIZE = int(os.environ.get("API_RESPONSE_CACHE_SIZE", 0))
+    API_RESPONSE_CACHE_TTL = int(os.environ.get("API_RESPONSE_CACHE_TTL", 30))
+
+    # Cache für Tokens und eingeloggte User
+    IDENTITY_CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", 10000))
+    IDENTITY_CACHE_TTL = int(os.environ.get("IDENTITY_CACHE_TTL", 60))
+
+    # Worker-Threads für Bildvarianten
+    IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+
+    # Obergrenze für NDJSON-Bulk-Importe
+    BULK_MAX_CONTENT_LENGTH = int(os.environ.get("BULK_MAX_CONTENT_LENGTH", 1024 * 1024 * 1024))
+
+    # Passwort-Hashing im Prozess-Pool: Worker, wartende Aufträge, Wartezeit auf einen Slot (s)
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", 16))
+    PASSWORD_HASH_WAIT = float(os.environ.get("PASSWORD_HASH_WAIT", 0.5))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get("PASSWORD_HASH_RETRY_AFTER", 2))
+    # PBKDF2-Iterationen (Standard wie Werkzeug); höhere Werte greifen per Rehash beim nächsten Login
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", DEFAULT_PBKDF2_ITERATIONS))
+
+    # Gerenderte Rezeptkarten/Detailseiten (LRU, Einträge; 0 = aus). Schlüssel enthalten die Rezept-Version
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 5000))
+    FRAGMENT_CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", 3600))
+
+    # Trending: Plätze in der Bestenliste, Halbwertszeit der Interaktionen, Sicherungsintervall (0 = nie)
+    TRENDING_SIZE = int(os.environ.get("TRENDING_SIZE", 100))
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 24))
+    TRENDING_PERSIST_SECONDS = int(os.environ.get("TRENDING_PERSIST_SECONDS", 300))
+
+    # Event-Streams (SSE): offene Streams pro Prozess, Laufzeit bis zum Neuverbinden (s), Retry-After bei 503
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get("EVENTS_MAX_SUBSCRIBERS", 200))
+    EVENTS_MAX_SECONDS = int(os.environ.get("EVENTS_MAX_SECONDS", 300))
+    EVENTS_RETRY_AFTER = int(os.environ.get("EVENTS_RETRY_AFTER", 5))
+
+    # Write-Behind für Bewertungen/Favoriten: gebündelt spätestens nach DELAY_MS geschrieben (aus = sofort)
+    WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "0") == "1"
+    WRITE_BEHIND_DELAY_MS = int(os.environ.get("WRITE_BEHIND_DELAY_MS", 200))
+    WRITE_BEHIND_MAX_BATCH = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", 500))
+
+    # Rate-Limits pro User (Token/Login) bzw. IP als Token-Bucket, z.B. "20/second burst 100".
+    # Schlüssel: "METHODE endpoint", endpoint oder Blueprint; der spezifischste gilt, None = unbegrenzt
+    RATE_LIMITS = json.loads(os.environ.get("RATE_LIMITS") or "null") or {
+        "api": "20/second burst 100",
+        "POST api.get_token": "10/minute burst 20",
+        "POST auth.login": "10/minute burst 20",
+        "POST auth.register": "5/minute burst 10",
+        "api.prometheus_metrics": None,
+    }
+    # memory:// zählt pro Prozess; redis://host:6379/0 teilt die Buckets zwischen allen Workern
+    RATE_LIMIT_STORAGE = os.environ.get("RATE_LIMIT_STORAGE", "memory://")
+    # Lastabwehr (0 = aus): brauchen Requests länger als TARGET_MS, sinkt die Grenze für gleichzeitige
+    # Requests pro Prozess bis MIN, überzählige bekommen sofort 503; erholt sie sich bis MAX, wird nicht
+    # mehr abgewiesen. Standardmäßig aus, mit SHED_MAX_CONCURRENCY=64 o.ä. einschalten
+    SHED_MAX_CONCURRENCY = int(os.environ.get("SHED_MAX_CONCURRENCY", 0))
+    SHED_MIN_CONCURRENCY = int(os.environ.get("SHED_MIN_CONCURRENCY", 4))
+    SHED_TARGET_MS = int(os.environ.get("SHED_TARGET_MS", 250))
+    SHED_RETRY_AFTER = int(os.environ.get("SHED_RETRY_AFTER", 1))
+    SHED_EXEMPT = ["static", "api.prometheus_metrics", "api.cache_stats"]
+
+    # Requests ab dieser Dauer werden mit ihren langsamsten Statements geloggt
+    SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 500))
+    # Optionales Bearer-Token für /api/_metrics
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
@@ -0,0 +1,42 @@
+"""recipe fts index
+
+FTS5-Volltextindex über Titel, Beschreibung, Zutaten und Schritte samt
+bm25-Spaltengewichten, aus den bestehenden Rezepten befüllt. Nur SQLite;
+andere Datenbanken suchen per LIKE.
+
+Revision ID: 5a0c1f7e93d4
+Revises: b957daf2de10
+Create Date: 2026-10-17 10:41:12.530817
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0c1f7e93d4'
+down_revision = 'b957daf2de10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts USING fts5("
+        "title, description, ingredients, steps, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # Titel wiegt am meisten, dann Zutaten
+    op.execute("INSERT INTO recipe_fts(recipe_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 4.0, 1.0)')")
+    op.execute("DELETE FROM recipe_fts")
+    op.execute(
+        "INSERT INTO recipe_fts(rowid, title, description, ingredients, steps) "
+        "SELECT id, title, description, ingredients, steps FROM recipe"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute("DROP TABLE IF EXISTS recipe_fts")
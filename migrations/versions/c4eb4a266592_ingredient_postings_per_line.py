@@ -0,0 +1,82 @@
+"""ingredient postings per line
+
+Posting-Listen mit Zeilennummer, damit die Vorratssuche abgedeckte Zutatenzeilen
+statt Begriffe zählt. Die Tabelle ist aus recipe.ingredients abgeleitet und wird
+neu aufgebaut.
+
+Revision ID: c4eb4a266592
+Revises: 265cb029c245
+Create Date: 2026-10-16 21:17:47.875228
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4eb4a266592'
+down_revision = '265cb029c245'
+branch_labels = None
+depends_on = None
+
+
+def _create(with_line):
+    line = ['line'] if with_line else []
+    op.create_table('recipe_ingredient',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('ingredient_id', sa.Integer(), nullable=False),
+    *[sa.Column(name, sa.Integer(), autoincrement=False, nullable=False) for name in line],
+    sa.ForeignKeyConstraint(['ingredient_id'], ['ingredient.id'], ),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipe.id'], ),
+    sa.PrimaryKeyConstraint('recipe_id', 'ingredient_id', *line)
+    )
+    with op.batch_alter_table('recipe_ingredient', schema=None) as batch_op:
+        batch_op.create_index('ix_recipe_ingredient_ingredient', ['ingredient_id', 'recipe_id', *line], unique=False)
+
+
+def _drop():
+    with op.batch_alter_table('recipe_ingredient', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipe_ingredient_ingredient')
+
+    op.drop_table('recipe_ingredient')
+
+
+def upgrade():
+    _drop()
+    _create(with_line=True)
+
+    # Backfill wie app/ingredients.py index_recipes(); das Vokabular existiert bereits
+    from app.ingredients import parse_lines
+    connection = op.get_bind()
+    recipe = sa.table('recipe', sa.column('id'), sa.column('ingredients'))
+    ingredient = sa.table('ingredient', sa.column('id'), sa.column('name'))
+    recipe_ingredient = sa.table('recipe_ingredient', sa.column('recipe_id'), sa.column('ingredient_id'), sa.column('line'))
+
+    postings, vocabulary = [], set()
+    for recipe_id, text in connection.execute(sa.select(recipe.c.id, recipe.c.ingredients)):
+        _, lines = parse_lines(text)
+        postings += [(recipe_id, line, term) for line, term in lines]
+        vocabulary.update(term for _, term in lines)
+    ids = dict(connection.execute(sa.select(ingredient.c.name, ingredient.c.id)).all())
+    missing = sorted(vocabulary - ids.keys())
+    if missing:
+        connection.execute(ingredient.insert(), [{'name': name} for name in missing])
+        ids = dict(connection.execute(sa.select(ingredient.c.name, ingredient.c.id)).all())
+    if postings:
+        connection.execute(recipe_ingredient.insert(), [
+            {'recipe_id': recipe_id, 'ingredient_id': ids[term], 'line': line}
+            for recipe_id, line, term in postings
+        ])
+
+
+def downgrade():
+    op.rename_table('recipe_ingredient', '_recipe_ingredient_lines')
+    with op.batch_alter_table('_recipe_ingredient_lines', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipe_ingredient_ingredient')
+
+    _create(with_line=False)
+    op.execute(
+        "INSERT INTO recipe_ingredient (recipe_id, ingredient_id) "
+        "SELECT DISTINCT recipe_id, ingredient_id FROM _recipe_ingredient_lines"
+    )
+    op.drop_table('_recipe_ingredient_lines')